@@ -1,9 +1,18 @@
-import requests
 import logging
+import time
 from typing import Dict, Any, List, Optional
 from fastapi import APIRouter, HTTPException
 from backend.cache.redis_cache import cache
 from backend.config import settings
+from backend.semantic_scholar import fetch_citations, fetch_references
+from backend.paper_index import paper_index
+from backend.progress import ProgressReporter
+from backend.timing import timed, json_response
+from backend.circuit_breaker import guarded_call, UpstreamUnavailable
+from backend.replay import recorded_get
+from backend.deadline import (
+    request_deadline, run_until_deadline, current_deadline, encode_continuation, decode_continuation
+)
 # Removed unused import - now using the logging handler approach
 
 # Configure logging with timestamp format
@@ -17,7 +26,7 @@ logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/graph", tags=["graph"])
 
 # Semantic Scholar API configuration
-SEMANTIC_SCHOLAR_API = "https://api.semanticscholar.org/graph/v1"
+SEMANTIC_SCHOLAR_API = settings.semantic_scholar_api
 
 @router.get("/paper/{paper_id}")
 async def get_paper(paper_id: str) -> Dict[str, Any]:
@@ -40,10 +49,14 @@ async def get_paper(paper_id: str) -> Dict[str, Any]:
             "fields": "title,abstract,year,authors,citationCount,references,venue"
         }
         
-        response = requests.get(paper_url, params=params, headers=headers)
+        with timed("s2"), guarded_call("semantic_scholar") as call:
+            response = recorded_get("semantic_scholar", paper_url, params=params, headers=headers,
+                                    timeout=settings.upstream_timeout)
+            call.status = response.status_code
         response.raise_for_status()
         
         paper_data = response.json()
+        paper_index.add([paper_data])
         logger.info(f"Successfully retrieved paper data with title: {paper_data.get('title', 'Unknown')}")
         
         # # Cache the result
@@ -52,13 +65,52 @@ async def get_paper(paper_id: str) -> Dict[str, Any]:
         
         return paper_data
     
+    except UpstreamUnavailable as e:
+        logger.info(f"Error getting paper details: {str(e)}")
+        raise unavailable_response(e)
     except Exception as e:
         logger.info(f"Error getting paper details: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting paper details: {str(e)}")
 
+def unavailable_response(e: UpstreamUnavailable) -> HTTPException:
+    """503 telling the client when the upstream may answer again"""
+    return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
+
+def resume_params(kind: str, continuation: Optional[str], **params: Any) -> Dict[str, Any]:
+    """
+    Request parameters of a graph request, taken from its continuation token
+    when one is given. Raises a 400 for a malformed token or one issued for
+    another paper.
+    """
+    if not continuation:
+        return params
+    try:
+        state = decode_continuation(continuation, kind)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    for name in ("paper_id", "source", "target"):
+        if name in params and state.get(name) != params[name]:
+            raise HTTPException(status_code=400, detail=f"Continuation token is for another {name}")
+    return {name: state.get(name, value) for name, value in params.items()}
+
+def partial_graph(kind: str, graph: Dict[str, Any], **params: Any) -> Dict[str, Any]:
+    """
+    Mark a graph cut short by its time budget. The upstream calls still in
+    flight keep filling the cache, so repeating the request with the
+    continuation token usually completes it.
+    """
+    return {**graph, "partial": True, "continuation": encode_continuation({"kind": kind, **params})}
+
 @router.get("/citations/{paper_id}")
-async def get_citations(paper_id: str, depth: int = 1, max_nodes: int = 50) -> Dict[str, Any]:
-    """Get citation network for a paper"""
+async def get_citations(paper_id: str, depth: int = 1, max_nodes: int = 50, debug: bool = False,
+                        time_budget: Optional[float] = None,
+                        continuation: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Get citation network for a paper. With time_budget (seconds), a graph
+    without neighbours marked "partial" is returned if Semantic Scholar has
+    not answered by then.
+    """
+    max_nodes = resume_params("citations", continuation, paper_id=paper_id, max_nodes=max_nodes)["max_nodes"]
     logger.info(f"Getting citation network for paper_id: {paper_id}, depth: {depth}, max_nodes: {max_nodes}")
     try:
         # Check cache first
@@ -69,58 +121,31 @@ async def get_citations(paper_id: str, depth: int = 1, max_nodes: int = 50) -> D
         #     logger.info("Returning cached result")
         #     return cached_result
         
-        # Get citation network from Semantic Scholar API
-        logger.info("Fetching citation network from Semantic Scholar API")
-        headers = {"User-Agent": "ScholarAssistant/1.0"}
-        citations_url = f"{SEMANTIC_SCHOLAR_API}/paper/{paper_id}/citations"
-        params = {
-            "limit": min(max_nodes, 100)  # Limit to 100 to avoid rate limiting
-        }
-        
-        # Try up to 5 times with exponential backoff
-        max_retries = 5
-        for attempt in range(max_retries):
-            response = requests.get(citations_url, params=params, headers=headers)
-            # Handle rate limiting
-            if response.status_code == 429:
-                wait_time = 5 * (2 ** attempt)  # Exponential backoff: 5, 10, 20, 40, 80 seconds
-                logger.info(f"Rate limit exceeded. Attempt {attempt + 1}/{max_retries}. Waiting for {wait_time} seconds before retry...")
-                import time
-                time.sleep(wait_time)
-                continue
-            else:
-                # Add a small delay to avoid rate limiting
-                import time
-                time.sleep(0.5)
-                break
-        else:
-            # If we've exhausted all retries
-            logger.info(f"Failed to get citation data after {max_retries} attempts due to rate limiting")
-            # Return empty data instead of raising an exception
-            citation_data = {"data": []}
-        
-        response.raise_for_status()
-        
-        citation_data = response.json()
-        logger.info(f"Retrieved citation data with {len(citation_data.get('data', []))} citations")
-        
-        # Process and format the data for visualization
-        logger.info("Processing citation data")
-        processed_data = process_citation_data(citation_data, paper_id)
+        with request_deadline(time_budget):
+            finished, processed_data = await run_until_deadline(build_citation_graph, paper_id, max_nodes)
+        if not finished:
+            logger.info(f"Citation network for {paper_id} reached its time budget of {time_budget}s")
+            processed_data = partial_graph("citations", {"nodes": [], "links": []}, paper_id=paper_id, max_nodes=max_nodes)
         
         # Cache the result
         # logger.info("Caching citation data")
         # cache.set(cache_key, processed_data)
         
-        return processed_data
+        return json_response(processed_data, debug)
     
+    except UpstreamUnavailable as e:
+        logger.info(f"Error getting citation network: {str(e)}")
+        raise unavailable_response(e)
     except Exception as e:
         logger.info(f"Error getting citation network: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting citation network: {str(e)}")
 
 @router.get("/references/{paper_id}")
-async def get_references(paper_id: str, depth: int = 1, max_nodes: int = 50) -> Dict[str, Any]:
-    """Get reference network for a paper"""
+async def get_references(paper_id: str, depth: int = 1, max_nodes: int = 50, debug: bool = False,
+                         time_budget: Optional[float] = None,
+                         continuation: Optional[str] = None) -> Dict[str, Any]:
+    """Get reference network for a paper; time_budget works as for citations"""
+    max_nodes = resume_params("references", continuation, paper_id=paper_id, max_nodes=max_nodes)["max_nodes"]
     logger.info(f"Getting reference network for paper_id: {paper_id}, depth: {depth}, max_nodes: {max_nodes}")
     try:
         # Check cache first
@@ -131,56 +156,247 @@ async def get_references(paper_id: str, depth: int = 1, max_nodes: int = 50) ->
         #     logger.info("Returning cached result")
         #     return cached_result
         
-        # Get reference network from Semantic Scholar API
-        logger.info("Fetching reference network from Semantic Scholar API")
-        headers = {"User-Agent": "ScholarAssistant/1.0"}
-        references_url = f"{SEMANTIC_SCHOLAR_API}/paper/{paper_id}/references"
-        params = {
-            "limit": min(max_nodes, 100),  # Limit to 100 to avoid rate limiting
-            "fields": "paperId,title,citationCount,year"  # Specify fields to retrieve
-        }
-        
-        # Try up to 5 times with exponential backoff
-        max_retries = 5
-        for attempt in range(max_retries):
-            response = requests.get(references_url, params=params, headers=headers)
-            # Handle rate limiting
-            if response.status_code == 429:
-                wait_time = 5 * (2 ** attempt)  # Exponential backoff: 5, 10, 20, 40, 80 seconds
-                logger.info(f"Rate limit exceeded. Attempt {attempt + 1}/{max_retries}. Waiting for {wait_time} seconds before retry...")
-                import time
-                time.sleep(wait_time)
-                continue
-            else:
-                # Add a small delay to avoid rate limiting
-                import time
-                time.sleep(0.5)
-                break
-        else:
-            # If we've exhausted all retries
-            logger.info(f"Failed to get reference data after {max_retries} attempts due to rate limiting")
-            # Return empty data instead of raising an exception
-            reference_data = {"data": []}
-        
-        response.raise_for_status()
-        
-        reference_data = response.json()
-        logger.info(f"Retrieved reference data with {len(reference_data.get('data', [])) if reference_data.get('data') else 0} references")
-        
-        # Process and format the data for visualization
-        logger.info("Processing reference data")
-        processed_data = process_reference_data(reference_data, paper_id)
+        with request_deadline(time_budget):
+            finished, processed_data = await run_until_deadline(build_reference_graph, paper_id, max_nodes)
+        if not finished:
+            logger.info(f"Reference network for {paper_id} reached its time budget of {time_budget}s")
+            processed_data = partial_graph("references", {"nodes": [], "links": []}, paper_id=paper_id, max_nodes=max_nodes)
         
         # Cache the result
         # logger.info("Caching reference data")
         # cache.set(cache_key, processed_data)
         
-        return processed_data
+        return json_response(processed_data, debug)
     
+    except UpstreamUnavailable as e:
+        logger.info(f"Error getting reference network: {str(e)}")
+        raise unavailable_response(e)
     except Exception as e:
         logger.info(f"Error getting reference network: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error getting reference network: {str(e)}")
 
+def build_citation_graph(paper_id: str, max_nodes: int = 50) -> Dict[str, Any]:
+    """Fetch and process the citation network of a paper (blocking)"""
+    # Get citation network from Semantic Scholar API
+    logger.info("Fetching citation network from Semantic Scholar API")
+    progress = ProgressReporter("citations", total=1)
+    with timed("citations"):
+        citation_data = fetch_citations(paper_id, limit=min(max_nodes, 100))  # Limit to 100 to avoid rate limiting
+    progress.update(1, item=paper_id)
+    logger.info(f"Retrieved citation data with {len(citation_data.get('data', []))} citations")
+    
+    # Process and format the data for visualization
+    logger.info("Processing citation data")
+    with timed("process"):
+        return process_citation_data(citation_data, paper_id)
+
+def build_reference_graph(paper_id: str, max_nodes: int = 50) -> Dict[str, Any]:
+    """Fetch and process the reference network of a paper (blocking)"""
+    # Get reference network from Semantic Scholar API
+    logger.info("Fetching reference network from Semantic Scholar API")
+    progress = ProgressReporter("references", total=1)
+    with timed("references"):
+        reference_data = fetch_references(
+            paper_id,
+            limit=min(max_nodes, 100),  # Limit to 100 to avoid rate limiting
+            fields="paperId,title,citationCount,year"  # Specify fields to retrieve
+        )
+    progress.update(1, item=paper_id)
+    logger.info(f"Retrieved reference data with {len(reference_data.get('data', [])) if reference_data.get('data') else 0} references")
+    
+    # Process and format the data for visualization
+    logger.info("Processing reference data")
+    with timed("process"):
+        return process_reference_data(reference_data, paper_id)
+
+@router.get("/path")
+async def get_citation_path(source: str, target: str, max_depth: int = 4, max_calls: int = 40, max_paths: int = 5,
+                            time_budget: Optional[float] = None,
+                            continuation: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Find the shortest citation paths leading from one paper to another.
+    With time_budget (seconds), the search stops expanding papers in time to
+    answer by the deadline, and the paths found so far are marked "partial".
+    """
+    params = resume_params("path", continuation, source=source, target=target,
+                           max_depth=max_depth, max_calls=max_calls, max_paths=max_paths)
+    logger.info(f"Searching citation path from {source} to {target}, max_depth: {max_depth}, max_calls: {max_calls}")
+    try:
+        with request_deadline(time_budget):
+            finished, result = await run_until_deadline(
+                find_citation_paths, source, target, params["max_depth"], params["max_calls"], params["max_paths"]
+            )
+        if not finished:
+            result = {"source": source, "target": target, "found": False, "length": None, "paths": [],
+                      "nodes": [], "links": [], "stats": {"deadline_reached": True}}
+        if result["stats"].get("deadline_reached"):
+            logger.info(f"Citation path search reached its time budget of {time_budget}s")
+            return partial_graph("path", result, **params)
+        logger.info(f"Citation path search finished with {len(result['paths'])} paths after {result['stats']['upstream_calls']} expansions")
+        return result
+
+    except UpstreamUnavailable as e:
+        logger.info(f"Error searching citation path: {str(e)}")
+        raise unavailable_response(e)
+    except Exception as e:
+        logger.info(f"Error searching citation path: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error searching citation path: {str(e)}")
+
+# Neighbour fields needed to label the papers on a path
+PATH_FIELDS = "paperId,title,citationCount,year"
+
+def find_citation_paths(source_id: str, target_id: str, max_depth: int = 4, max_calls: int = 40,
+                        max_paths: int = 5, fan_out: int = 100) -> Dict[str, Any]:
+    """
+    Bidirectional breadth-first search for chains source -> ... -> target where
+    every arrow means "cites". The source side walks forward through references,
+    the target side walks backward through citations, and the smaller frontier
+    is always expanded next. Each node expansion costs at most one upstream call
+    (fewer when cached), and the search stops after max_calls expansions.
+    """
+    # node -> distance from its side, and node -> neighbours one step closer to that side
+    forward_dist = {source_id: 0}
+    backward_dist = {target_id: 0}
+    forward_parents: Dict[str, List[str]] = {source_id: []}
+    backward_parents: Dict[str, List[str]] = {target_id: []}
+    forward_frontier = [source_id]
+    backward_frontier = [target_id]
+    papers: Dict[str, Dict[str, Any]] = {}
+    calls = 0
+    truncated = False
+    deadline_reached = False
+    meeting = {source_id} if source_id == target_id else set()
+    progress = ProgressReporter("path_search", total=max_calls)
+    deadline = current_deadline()
+    started = time.perf_counter()
+
+    while not meeting and forward_frontier and backward_frontier:
+        depth = max(forward_dist.values()) + max(backward_dist.values())
+        if depth >= max_depth:
+            break
+
+        expand_forward = len(forward_frontier) <= len(backward_frontier)
+        if expand_forward:
+            frontier, dist, parents, other_dist = forward_frontier, forward_dist, forward_parents, backward_dist
+        else:
+            frontier, dist, parents, other_dist = backward_frontier, backward_dist, backward_parents, forward_dist
+
+        next_level: Dict[str, List[str]] = {}
+        for node in frontier:
+            if calls >= max_calls:
+                truncated = True
+                break
+            # Stop once another expansion (at the average cost so far) would overrun the deadline
+            if deadline is not None and (deadline.expired() or
+                                         (calls and deadline.remaining() < (time.perf_counter() - started) / calls)):
+                truncated = deadline_reached = True
+                break
+            calls += 1
+            progress.update(calls, item=node)
+            try:
+                if expand_forward:
+                    entries = fetch_references(node, limit=fan_out, fields=PATH_FIELDS).get("data") or []
+                else:
+                    entries = fetch_citations(node, limit=fan_out, fields=PATH_FIELDS).get("data") or []
+            except UpstreamUnavailable:
+                # Without Semantic Scholar, "no path" would be a wrong answer
+                raise
+            except Exception as e:
+                logger.info(f"Skipping {node} during path search: {str(e)}")
+                continue
+
+            for entry in entries:
+                if not entry or not isinstance(entry, dict):
+                    continue
+                paper_data = entry.get("citedPaper" if expand_forward else "citingPaper", entry) or {}
+                neighbour = paper_data.get("paperId")
+                if not neighbour or neighbour in dist:
+                    continue
+                papers.setdefault(neighbour, paper_data)
+                next_level.setdefault(neighbour, []).append(node)
+
+        level = dist[frontier[0]] + 1
+        for neighbour, via in next_level.items():
+            dist[neighbour] = level
+            parents[neighbour] = via
+        if expand_forward:
+            forward_frontier = list(next_level)
+        else:
+            backward_frontier = list(next_level)
+
+        touching = [n for n in next_level if n in other_dist]
+        if touching:
+            best = min(forward_dist[n] + backward_dist[n] for n in touching)
+            meeting = {n for n in touching if forward_dist[n] + backward_dist[n] == best}
+        if truncated:
+            break
+
+    progress.finish()
+    paths = []
+    for node in sorted(meeting):
+        for head in _walk_parents(node, forward_parents, max_paths):
+            for tail in _walk_parents(node, backward_parents, max_paths):
+                paths.append(list(reversed(head)) + tail[1:])
+                if len(paths) >= max_paths:
+                    break
+            if len(paths) >= max_paths:
+                break
+        if len(paths) >= max_paths:
+            break
+
+    nodes = []
+    links = []
+    seen_nodes = set()
+    seen_links = set()
+    for path in paths:
+        for position, paper_id in enumerate(path):
+            if paper_id not in seen_nodes:
+                seen_nodes.add(paper_id)
+                paper_data = papers.get(paper_id, {})
+                title = paper_data.get("title") or "Unknown title"
+                nodes.append({
+                    "id": paper_id,
+                    "cited_by_count": paper_data.get("citationCount", 0),
+                    "year": paper_data.get("year"),
+                    "title": title[:50] + ("..." if len(title) > 50 else ""),
+                    "type": "root" if paper_id in (source_id, target_id) else "path"
+                })
+            if position + 1 < len(path) and (paper_id, path[position + 1]) not in seen_links:
+                seen_links.add((paper_id, path[position + 1]))
+                # Same orientation as process_reference_data: cited paper -> citing paper
+                links.append({"source": path[position + 1], "target": paper_id, "type": "path"})
+
+    return {
+        "source": source_id,
+        "target": target_id,
+        "found": bool(paths),
+        "length": len(paths[0]) - 1 if paths else None,
+        "paths": paths,
+        "nodes": nodes,
+        "links": links,
+        "stats": {
+            "upstream_calls": calls,
+            "visited_forward": len(forward_dist),
+            "visited_backward": len(backward_dist),
+            "truncated": truncated,
+            "deadline_reached": deadline_reached
+        }
+    }
+
+def _walk_parents(node: str, parents: Dict[str, List[str]], limit: int) -> List[List[str]]:
+    """Enumerate up to limit chains from node back to the root of its search side"""
+    chains = []
+    stack = [[node]]
+    while stack and len(chains) < limit:
+        chain = stack.pop()
+        via = parents.get(chain[-1], [])
+        if not via:
+            chains.append(chain)
+            continue
+        for parent in via:
+            stack.append(chain + [parent])
+    return chains
+
 def process_citation_data(data: Dict[str, Any], root_id: str) -> Dict[str, Any]:
     """Process citation data into a visualization-friendly format"""
     logger.info("Processing citation data for visualization")
@@ -0,0 +1,147 @@
+import asyncio
+import json
+import logging
+from typing import Dict, Any, List
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+from backend.exporters import iter_graph_export, graph_export_headers, graph_media_type
+from backend.jobs.search_jobs import search_jobs, FINISHED_STATES
+from backend.jobs.crawl_jobs import crawl_jobs, FINISHED_STATES as CRAWL_FINISHED_STATES
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+class SearchJobRequest(BaseModel):
+    queries: List[str]
+    max_results: int = 20
+
+class CrawlJobRequest(BaseModel):
+    paper_id: str
+    direction: str = "both"
+    max_depth: int = 2
+    max_nodes: int = 500
+    fan_out: int = 100
+
+def get_search_job_or_404(job_id: str) -> Dict[str, Any]:
+    job = search_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Search job not found: {job_id}")
+    return job
+
+@router.post("/search")
+async def submit_search_job(request: SearchJobRequest) -> Dict[str, Any]:
+    """Submit a batch of search queries to run in the background"""
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="At least one query is required")
+    logger.info(f"Submitting search job with {len(request.queries)} queries")
+    job = search_jobs.submit(request.queries, request.max_results)
+    return search_jobs.progress(job)
+
+@router.get("/search/{job_id}")
+async def get_search_job(job_id: str) -> Dict[str, Any]:
+    """Get the progress of a search job"""
+    return search_jobs.progress(get_search_job_or_404(job_id))
+
+@router.get("/search/{job_id}/events")
+async def stream_search_job(job_id: str, interval: float = 1.0):
+    """Stream progress snapshots as JSON lines until the job finishes"""
+    job = get_search_job_or_404(job_id)
+
+    async def events():
+        last = None
+        while True:
+            progress = search_jobs.progress(job)
+            if progress != last:
+                yield json.dumps(progress) + "\n"
+                last = progress
+            if progress["status"] in FINISHED_STATES:
+                break
+            await asyncio.sleep(max(interval, 0.1))
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.get("/search/{job_id}/results")
+async def get_search_job_results(job_id: str) -> Dict[str, Any]:
+    """Get the results of a search job collected so far"""
+    return search_jobs.results(get_search_job_or_404(job_id))
+
+def get_crawl_job_or_404(job_id: str) -> Dict[str, Any]:
+    job = crawl_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Crawl job not found: {job_id}")
+    return job
+
+@router.post("/crawl")
+async def submit_crawl_job(request: CrawlJobRequest) -> Dict[str, Any]:
+    """Start a background citation/reference crawl around a paper"""
+    if request.direction not in ("citations", "references", "both"):
+        raise HTTPException(status_code=400, detail=f"Unsupported crawl direction: {request.direction}")
+    logger.info(f"Submitting crawl job for paper_id: {request.paper_id}")
+    job = crawl_jobs.submit(request.paper_id, request.direction, request.max_depth, request.max_nodes, request.fan_out)
+    return crawl_jobs.progress(job)
+
+@router.get("/crawl/{job_id}")
+async def get_crawl_job(job_id: str) -> Dict[str, Any]:
+    """Get the progress of a crawl job"""
+    return crawl_jobs.progress(get_crawl_job_or_404(job_id))
+
+@router.post("/crawl/{job_id}/pause")
+async def pause_crawl_job(job_id: str) -> Dict[str, Any]:
+    """Pause a crawl after its current expansion; its frontier is kept"""
+    get_crawl_job_or_404(job_id)
+    return crawl_jobs.progress(crawl_jobs.pause(job_id))
+
+@router.post("/crawl/{job_id}/resume")
+async def resume_crawl_job(job_id: str) -> Dict[str, Any]:
+    """Resume a paused crawl from its last checkpoint"""
+    get_crawl_job_or_404(job_id)
+    return crawl_jobs.progress(crawl_jobs.resume(job_id))
+
+@router.post("/crawl/{job_id}/cancel")
+async def cancel_crawl_job(job_id: str) -> Dict[str, Any]:
+    """Cancel a crawl; the graph collected so far stays available"""
+    get_crawl_job_or_404(job_id)
+    return crawl_jobs.progress(crawl_jobs.cancel(job_id))
+
+@router.get("/crawl/{job_id}/events")
+async def stream_crawl_job(job_id: str, interval: float = 0.5):
+    """Stream progress events as JSON lines until the crawl stops"""
+    get_crawl_job_or_404(job_id)
+
+    async def events():
+        since = 0.0
+        while True:
+            for event in crawl_jobs.events_since(job_id, since):
+                since = event["time"]
+                yield json.dumps(event) + "\n"
+            if crawl_jobs.get(job_id)["status"] in CRAWL_FINISHED_STATES | {"paused"}:
+                # Flush events emitted between the last read and the status check
+                for event in crawl_jobs.events_since(job_id, since):
+                    yield json.dumps(event) + "\n"
+                break
+            await asyncio.sleep(max(interval, 0.1))
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.get("/crawl/{job_id}/graph")
+async def get_crawl_graph(job_id: str, format: str = "json"):
+    """
+    Get the crawled graph. JSON is served from the materialized graph once the
+    crawl has completed; other formats stream straight from the job store and
+    also work while the crawl is still running.
+    """
+    job = get_crawl_job_or_404(job_id)
+    if format == "json":
+        graph = crawl_jobs.graph(job_id)
+        if graph is None:
+            raise HTTPException(status_code=409, detail=f"Crawl job {job_id} has not completed (status: {job['status']})")
+        return graph
+    if graph_media_type(format) is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    return StreamingResponse(
+        iter_graph_export(format, crawl_jobs.iter_nodes(job_id), crawl_jobs.iter_links(job_id)),
+        media_type=graph_media_type(format),
+        headers=graph_export_headers(format, f"crawl_{job_id}")
+    )
@@ -1,13 +1,27 @@
-import requests
-import os
+import json
+import asyncio
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional
+import contextvars
+from concurrent.futures import Future, ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, List, Dict, Any, Optional, Iterable, Iterator
 from fastapi import APIRouter, HTTPException
 from backend.cache.redis_cache import cache
 from backend.config import settings
+from backend.semantic_scholar import s2_get, remember_title, normalize_title
+from backend.progress import ProgressReporter
+from backend.timing import timed, json_response
+from backend.circuit_breaker import guarded_call, UpstreamUnavailable
+from backend.metrics import search_hedges
+from backend.profiling import profiled
+from backend.replay import recorded_call, serp_request
+from backend.result_archive import search_archive
+from backend.paper_index import paper_index
+from backend.deadline import (
+    DeadlineExceeded, request_deadline, run_until_deadline, check_deadline, current_deadline,
+    encode_continuation, decode_continuation
+)
 # Removed unused import - now using the logging handler approach
-import serpapi
-from openai import OpenAI
 
 # Configure logging with timestamp format
 logging.basicConfig(
@@ -19,139 +33,477 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/search", tags=["search"])
 
-# Semantic Scholar API configuration
-SEMANTIC_SCHOLAR_API = "https://api.semanticscholar.org/graph/v1"
+SEARCH_MODES = ("serpapi", "hedged", "local")
 
 @router.get("/papers")
-async def search_papers(query: str, max_results: int = 50) -> Dict[str, Any]:
+async def search_papers(query: str, max_results: int = 50, debug: bool = False,
+                        time_budget: Optional[float] = None,
+                        continuation: Optional[str] = None,
+                        mode: Optional[str] = None,
+                        hedge_delay_ms: Optional[float] = None,
+                        fallback: Optional[bool] = None,
+                        rerank: Optional[bool] = None,
+                        citation_weight: Optional[float] = None,
+                        recency_weight: Optional[float] = None) -> Dict[str, Any]:
     """
     Search for academic papers using Google Scholar API via SerpAPI
     and enrich the results with information from Semantic Scholar API.
-    """
-    logger.info(f"Starting search for papers with query: {query}, max_results: {max_results}")
-    try:
-        # Extract English keywords from Chinese query if needed
-        english_query = extract_keywords(query)
-        logger.info(f"Using English query for search: {english_query}")
-        
-        # Check cache first using the English query
-        # cache_key = f"search:{english_query}:{max_results}"
-        # logger.info(f"Checking cache for key: {cache_key}")
-        # cached_result = cache.get(cache_key)
-        # if cached_result:
-        #     logger.info("Returning cached result")
-        #     return cached_result
-        
-        # Google Scholar search using SerpAPI
-        logger.info("Performing Google Scholar search via SerpAPI")
-        params = {
-            "engine": "google_scholar",
-            "q": english_query,
-            "api_key": settings.serpapi_key,
-            "num": max_results
-        }
+    With debug, the response includes per-stage timings.
 
+    mode "hedged" also asks Semantic Scholar's own search when SerpAPI has
+    not answered after hedge_delay_ms (defaults: SEARCH_MODE and
+    SEARCH_HEDGE_DELAY_MS). mode "local" only searches the local paper index.
 
-        client = serpapi.Client(api_key=settings.serpapi_key)
-        results = client.search(params)
+    With fallback (default: SEARCH_LOCAL_FALLBACK), a search that fails is
+    answered from the local paper index instead, and one cut short by its
+    time budget is topped up from it; such responses carry "fallback": "local".
 
-        # Save the results to local
-        import json
-        import os
-        from datetime import datetime
-        
-        # Create a directory for saving results if it doesn't exist
-        save_dir = "search_results"
-        if not os.path.exists(save_dir):
-            os.makedirs(save_dir)
-        
-        # Create a filename based on the query and timestamp
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{save_dir}/search_results_{english_query.replace(' ', '_')}_{timestamp}.json"
-        
-        # Convert SerpResults to a serializable dictionary
-        serializable_results = {}
-        if hasattr(results, '__dict__'):
-            # If results is a SerpResults object, convert it to dict
-            serializable_results = results.as_dict()
-        else:
-            # If results is already a dict, use it directly
-            serializable_results = dict(results)
-        
-        # Save the raw results
-        try:
-            with open(filename, 'w', encoding='utf-8') as f:
-                json.dump(serializable_results, f, ensure_ascii=False, indent=2)
-            logger.info(f"Search results saved to {filename}")
-        except Exception as e:
-            logger.info(f"Error saving search results: {str(e)}")
-        
+    With rerank (default: SEARCH_RERANK), the papers are ordered by relevance
+    to the query instead of Google Scholar's order; citation_weight and
+    recency_weight override RERANK_CITATION_WEIGHT and RERANK_RECENCY_WEIGHT.
 
-        organic_results = results.get("organic_results", [])
-        logger.info(f"Google Scholar search returned {len(organic_results)} results")
-        
-        # Process results and enrich with Semantic Scholar data
-        processed_results = []
-        for i, result in enumerate(organic_results):
-            logger.info(f"Processing result {i+1}: {result.get('title', 'Unknown title')}")
-            paper_info = {
-                "title": result.get("title"),
-                "link": result.get("link"),
-                "snippet": result.get("snippet"),
-                "source": result.get("source"),
-                "id": result.get("result_id"),
-                "cited_by_count": 0,
-                "year": None,
-                "authors": [],
-                "abstract": result.get("snippet")
-            }
-            
-            # Get more detailed information from Semantic Scholar API
-            semantic_scholar_id = None
-            if settings.serpapi_key and result.get("title"):
-                logger.info(f"Fetching Semantic Scholar data for: {result['title']}")
-                semantic_data = get_semantic_scholar_data(result["title"])
-                if semantic_data:
-                    logger.info("Successfully retrieved Semantic Scholar data")
-                    semantic_scholar_id = semantic_data.get("paperId")
-                    paper_info.update({
-                        "title": semantic_data.get("title", paper_info["title"]),
-                        "abstract": semantic_data.get("abstract", paper_info["abstract"]),
-                        "year": semantic_data.get("year"),
-                        "cited_by_count": semantic_data.get("citationCount", 0),
-                        "authors": [author["name"] for author in semantic_data.get("authors", [])],
-                        "paperId": semantic_scholar_id  # Add Semantic Scholar ID
-                    })
-                else:
-                    logger.info("No Semantic Scholar data found for this paper")
-            
-            # If we found a Semantic Scholar ID, use it; otherwise skip this paper
-            if semantic_scholar_id:
-                paper_info["id"] = semantic_scholar_id
-                processed_results.append(paper_info)
-            else:
-                logger.info("Skipping paper due to missing Semantic Scholar ID")
+    With time_budget (seconds), the papers enriched by then are returned with
+    "partial": true and a continuation token; passing the token back resumes
+    the search after the last paper returned.
+    """
+    try:
+        resume = decode_continuation(continuation, "search") if continuation else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if mode is not None and mode not in SEARCH_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown search mode: {mode}")
+    hedge_delay = hedge_delay_ms / 1000 if hedge_delay_ms is not None else None
+    fallback = settings.search_local_fallback if fallback is None else fallback
+    rerank = settings.search_rerank if rerank is None else rerank
+
+    def ranked(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        if not rerank:
+            return results
+        # Imported on first use, like the SDK clients: numpy slows down startup
+        from backend.rerank import rerank_results
+        with timed("rerank"):
+            return rerank_results(state.get("query") or query, results, citation_weight, recency_weight)
+
+    try:
+        state: Dict[str, Any] = {"results": []}
+        with request_deadline(time_budget):
+            finished, _ = await run_until_deadline(
+                collect_search_results, query, max_results, resume, state, mode, hedge_delay
+            )
+        processed_results = list(state["results"])
         
         # Cache the results
         # logger.info("Caching search results")
         # cache.set(cache_key, {"results": processed_results})
         
+        if not finished:
+            logger.info(f"Search reached its time budget of {time_budget}s with {len(processed_results)} results")
+            payload = {
+                "results": processed_results,
+                "partial": True,
+                "continuation": search_continuation(query, max_results, state)
+            }
+            if fallback and len(processed_results) < max_results:
+                local = await local_results(state.get("query") or query, max_results - len(processed_results),
+                                            {paper["id"] for paper in processed_results})
+                if local:
+                    payload.update(results=processed_results + local, fallback="local")
+            payload["results"] = ranked(payload["results"])
+            return json_response(payload, debug)
         logger.info(f"Search completed successfully with {len(processed_results)} results")
-        return {"results": processed_results}
+        return json_response({"results": ranked(processed_results)}, debug)
     
     except Exception as e:
         logger.info(f"Error searching for papers: {str(e)}")
+        local = await local_fallback(state.get("query") or query, max_results) if fallback else []
+        if local:
+            logger.info(f"Answering from the local paper index with {len(local)} results")
+            return json_response({"results": ranked(local), "fallback": "local", "error": str(e)}, debug)
+        if isinstance(e, UpstreamUnavailable):
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(int(e.retry_after) + 1)})
         raise HTTPException(status_code=500, detail=f"Error searching for papers: {str(e)}")
 
+@router.get("/local")
+async def search_local(query: str, max_results: int = 20, debug: bool = False) -> Dict[str, Any]:
+    """
+    Search every paper seen in Semantic Scholar responses (BM25 over titles,
+    abstracts and authors) without calling any upstream
+    """
+    try:
+        return json_response({"results": await local_results(query, max_results)}, debug)
+    except Exception as e:
+        logger.info(f"Error searching the local paper index: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error searching the local paper index: {str(e)}")
+
+async def local_results(query: str, limit: int, exclude: Iterable[str] = ()) -> List[Dict[str, Any]]:
+    """Best local index matches for query, leaving out the paper ids in exclude"""
+    exclude = set(exclude)
+    with timed("local_search"):
+        results = await asyncio.to_thread(paper_index.search, query, limit + len(exclude))
+    return [paper for paper in results if paper["id"] not in exclude][:limit]
+
+async def local_fallback(query: str, limit: int) -> List[Dict[str, Any]]:
+    """local_results for a search that failed; empty if the index cannot answer either"""
+    try:
+        return await local_results(query, limit)
+    except Exception as e:
+        logger.info(f"Error searching the local paper index: {str(e)}")
+        return []
+
+@router.get("/archive")
+async def list_archived_searches(query: Optional[str] = None, since: Optional[float] = None,
+                                 until: Optional[float] = None, limit: int = 100) -> Dict[str, Any]:
+    """List archived raw search responses, newest first (times are Unix timestamps)"""
+    logger.info(f"Listing archived searches for query: {query}")
+    try:
+        return {"records": await asyncio.to_thread(search_archive.find, query, since, until, limit)}
+    except Exception as e:
+        logger.info(f"Error listing archived searches: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error listing archived searches: {str(e)}")
+
+@router.get("/archive/{record_id}")
+async def get_archived_search(record_id: int) -> Dict[str, Any]:
+    """Return one archived raw search response"""
+    record = await asyncio.to_thread(search_archive.read, record_id)
+    if record is None:
+        raise HTTPException(status_code=404, detail=f"Archived search {record_id} not found")
+    return record
+
+def iter_search_results(query: str, max_results: int = 50, resume: Optional[Dict[str, Any]] = None,
+                        state: Optional[Dict[str, Any]] = None, mode: Optional[str] = None,
+                        hedge_delay: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Run the search pipeline and yield each paper as soon as it has been
+    enriched with Semantic Scholar data, so callers can stream results.
+
+    resume is a decoded continuation token to pick up after; state, if given,
+    is kept up to date with the English query, the Google Scholar results and
+    the index of the next one to enrich. Under a time budget no stage starts
+    after the deadline (DeadlineExceeded). mode and hedge_delay (seconds)
+    default to SEARCH_MODE and SEARCH_HEDGE_DELAY_MS.
+    """
+    state = state if state is not None else {}
+    if (mode or settings.search_mode) == "local":
+        # No keyword extraction either: the local index answers without any upstream
+        state.update(query=query)
+        yield from paper_index.search(query, max_results)
+        return
+    if resume and resume.get("query"):
+        english_query = resume["query"]
+        max_results = resume.get("max_results", max_results)
+        logger.info(f"Resuming search for: {english_query} at result {resume.get('offset', 0)}")
+        state["query"] = english_query
+        organic_results = resume_google_scholar(english_query, max_results)
+        offset = resume.get("offset", 0)
+        state.update(organic_results=organic_results, offset=offset)
+        yield from enrich_results(organic_results, offset, state)
+        return
+
+    logger.info(f"Starting search for papers with query: {query}, max_results: {max_results}")
+    # Extract English keywords from Chinese query if needed
+    progress = ProgressReporter("keywords", total=1)
+    with timed("keywords"):
+        english_query = extract_keywords(query)
+    progress.update(1, item=english_query)
+    logger.info(f"Using English query for search: {english_query}")
+    state["query"] = english_query
+    
+    # Check cache first using the English query
+    # cache_key = f"search:{english_query}:{max_results}"
+    # logger.info(f"Checking cache for key: {cache_key}")
+    # cached_result = cache.get(cache_key)
+    # if cached_result:
+    #     logger.info("Returning cached result")
+    #     return cached_result
+    
+    check_deadline()
+    if (mode or settings.search_mode) == "hedged":
+        if hedge_delay is None:
+            hedge_delay = settings.search_hedge_delay_ms / 1000
+        yield from iter_hedged_results(english_query, max_results, hedge_delay, state)
+        return
+    progress = ProgressReporter("scholar_search", total=1)
+    organic_results = search_google_scholar(english_query, max_results)
+    progress.update(1)
+    if current_deadline() is not None:
+        # Keep the results for an hour in case the search has to be resumed,
+        # so resuming does not repeat the SerpAPI call
+        remember_organic_results(english_query, max_results, organic_results)
+    state.update(organic_results=organic_results, offset=0)
+    yield from enrich_results(organic_results, 0, state)
+
+def enrich_results(organic_results: List[Dict[str, Any]], offset: int,
+                   state: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """Enrich and yield the Google Scholar results from offset on, recording progress in state"""
+    # Process results and enrich with Semantic Scholar data
+    progress = ProgressReporter("enrich", total=len(organic_results))
+    for i in range(offset, len(organic_results)):
+        check_deadline()
+        state["offset"] = i
+        result = organic_results[i]
+        logger.info(f"Processing result {i+1}: {result.get('title', 'Unknown title')}")
+        with timed("enrich"):
+            paper_info = enrich_result(result)
+        progress.update(i + 1, item=result.get("title"))
+        if paper_info:
+            yield paper_info
+    state["offset"] = len(organic_results)
+
+# Threads running the two sources of a hedged search
+_hedge_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix="search-hedge")
+
+def submit_source(func: Callable[..., Any], *args: Any) -> Future:
+    """Run one search source on the hedge pool, in the caller's context (request id, timings, deadline)"""
+    context = contextvars.copy_context()
+    return _hedge_pool.submit(context.run, profiled(func), *args)
+
+def iter_hedged_results(english_query: str, max_results: int, hedge_delay: float,
+                        state: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    """
+    Hedged search: ask SerpAPI, and if it has not answered (or has failed)
+    after hedge_delay seconds, also Semantic Scholar's /paper/search. Papers
+    from whichever answers first are yielded first; the other source is
+    merged in when it arrives, without repeating papers. Google Scholar
+    results that the Semantic Scholar search already returned are not
+    looked up again. At most one extra upstream call per search.
+    """
+    progress = ProgressReporter("scholar_search", total=1)
+    serp = submit_source(search_google_scholar, english_query, max_results)
+    hedge: Optional[Future] = None
+    done, _ = wait([serp], timeout=hedge_delay)
+    if not done or serp.exception() is not None:
+        check_deadline()
+        logger.info(f"SerpAPI has not answered within {hedge_delay}s, hedging with Semantic Scholar search")
+        hedge = submit_source(search_semantic_scholar, english_query, max_results)
+        wait([serp, hedge], return_when=FIRST_COMPLETED)
+    first = "serpapi" if serp.done() and serp.exception() is None else "semantic_scholar"
+    search_hedges.inc(first=first if hedge is not None else "serpapi_unhedged")
+
+    yielded_ids = set()
+    hedge_titles = set()
+    hedge_merged = False
+
+    def merge_hedge(block: bool) -> List[Dict[str, Any]]:
+        """The hedge's papers not yielded yet, once it has answered; [] if it failed"""
+        nonlocal hedge_merged
+        if hedge is None or hedge_merged or not (block or hedge.done()):
+            return []
+        hedge_merged = True
+        try:
+            papers = hedge.result()
+        except Exception as e:
+            logger.info(f"Semantic Scholar search failed during hedged search: {str(e)}")
+            return []
+        hedge_titles.update(normalize_title(paper["title"] or "") for paper in papers)
+        return [paper for paper in papers if paper["id"] not in yielded_ids]
+
+    def emit(paper: Dict[str, Any]) -> bool:
+        """Record a paper about to be yielded; False if it is a duplicate or the result set is full"""
+        if paper["id"] in yielded_ids or len(yielded_ids) >= max_results:
+            return False
+        yielded_ids.add(paper["id"])
+        return True
+
+    for paper in merge_hedge(block=False):
+        if emit(paper):
+            yield paper
+    if len(yielded_ids) >= max_results:
+        # The hedge filled the result set; SerpAPI's answer is not needed
+        progress.update(1)
+        return
+
+    try:
+        organic_results = serp.result()
+    except Exception as e:
+        if hedge is None:
+            raise
+        logger.info(f"SerpAPI failed during hedged search, using Semantic Scholar results: {str(e)}")
+        for paper in merge_hedge(block=True):
+            if emit(paper):
+                yield paper
+        if not hedge_merged or hedge.exception() is not None:
+            raise
+        return
+    progress.update(1)
+    state.update(organic_results=organic_results, offset=0)
+
+    progress = ProgressReporter("enrich", total=len(organic_results))
+    for i, result in enumerate(organic_results):
+        check_deadline()
+        state["offset"] = i
+        for paper in merge_hedge(block=False):
+            if emit(paper):
+                yield paper
+        if len(yielded_ids) >= max_results:
+            break
+        if normalize_title(result.get("title") or "") in hedge_titles:
+            logger.info(f"Already found by Semantic Scholar search: {result.get('title')}")
+            continue
+        logger.info(f"Processing result {i+1}: {result.get('title', 'Unknown title')}")
+        with timed("enrich"):
+            paper_info = enrich_result(result)
+        progress.update(i + 1, item=result.get("title"))
+        if paper_info and emit(paper_info):
+            yield paper_info
+    state["offset"] = len(organic_results)
+    # A hedge still in flight is merged in once it answers
+    for paper in merge_hedge(block=True):
+        if emit(paper):
+            yield paper
+
+def collect_search_results(query: str, max_results: int, resume: Optional[Dict[str, Any]],
+                           state: Dict[str, Any], mode: Optional[str] = None,
+                           hedge_delay: Optional[float] = None):
+    """Run the search pipeline, appending each paper to state["results"] as it resolves (blocking)"""
+    try:
+        for paper in iter_search_results(query, max_results, resume, state, mode, hedge_delay):
+            state["results"].append(paper)
+    except DeadlineExceeded:
+        logger.info(f"Search stopped at its deadline after {len(state['results'])} results")
+
+def organic_cache_key(english_query: str, max_results: int) -> str:
+    digest = hashlib.sha256(english_query.encode("utf-8")).hexdigest()[:32]
+    return f"search:organic:{digest}:{max_results}"
+
+# Writes the organic results of time-budgeted searches to the cache
+_cache_writer = ThreadPoolExecutor(max_workers=2, thread_name_prefix="search-cache")
+
+def remember_organic_results(english_query: str, max_results: int, organic_results: List[Dict[str, Any]]):
+    """
+    Cache the Google Scholar results for resuming, without waiting: the write
+    is best-effort and must not use up the search's time budget
+    """
+    _cache_writer.submit(cache.set, organic_cache_key(english_query, max_results),
+                         {"results": organic_results}, ttl=3600)
+
+def search_continuation(query: str, max_results: int, state: Dict[str, Any]) -> str:
+    """
+    Token to resume a search cut short by its time budget after the last
+    paper returned; the search starts over if it had not reached Google
+    Scholar yet
+    """
+    if "organic_results" not in state:
+        return encode_continuation({"kind": "search", "max_results": max_results})
+    return encode_continuation({
+        "kind": "search",
+        "query": state["query"],
+        "max_results": max_results,
+        "offset": state["offset"]
+    })
+
+def resume_google_scholar(english_query: str, max_results: int) -> List[Dict[str, Any]]:
+    """The Google Scholar results of a search being resumed, from the cache or SerpAPI again"""
+    cached = cache.get(organic_cache_key(english_query, max_results))
+    if cached is not None:
+        return cached["results"]
+    check_deadline()
+    return search_google_scholar(english_query, max_results)
+
+# Upstream SDK clients, built on first use: importing serpapi and openai
+# takes most of the backend's startup time
+_serpapi_client = None
+_dashscope_client = None
+
+def get_serpapi_client():
+    global _serpapi_client
+    if _serpapi_client is None:
+        import serpapi
+        client = serpapi.Client(api_key=settings.serpapi_key, timeout=settings.upstream_timeout)
+        client.BASE_DOMAIN = settings.serpapi_base_url
+        _serpapi_client = client
+    return _serpapi_client
+
+def get_dashscope_client():
+    """OpenAI-compatible client for DashScope"""
+    global _dashscope_client
+    if _dashscope_client is None:
+        from openai import OpenAI
+        _dashscope_client = OpenAI(
+            api_key=settings.dashscope_api_key,
+            base_url=settings.dashscope_base_url,
+            timeout=settings.upstream_timeout,
+        )
+    return _dashscope_client
+
+def preload_clients():
+    """Build the upstream clients ahead of the first search"""
+    get_serpapi_client()
+    get_dashscope_client()
+    if settings.search_rerank:
+        # Load numpy too, so the first reranked search does not wait for it
+        import backend.rerank
+
+def search_google_scholar(english_query: str, max_results: int) -> List[Dict[str, Any]]:
+    """Run the Google Scholar search via SerpAPI and archive the raw response"""
+    # Google Scholar search using SerpAPI
+    logger.info("Performing Google Scholar search via SerpAPI")
+    params = {
+        "engine": "google_scholar",
+        "q": english_query,
+        "api_key": settings.serpapi_key,
+        "num": max_results
+    }
+
+    client = get_serpapi_client()
+    with timed("serp"), guarded_call("serpapi"):
+        results = recorded_call("serpapi", serp_request(params), lambda: client.search(params).as_dict())
+
+    # Archive the raw results on the background writer, off the request path
+    with timed("serp_archive"):
+        search_archive.submit(english_query, results)
+
+    organic_results = results.get("organic_results", [])
+    logger.info(f"Google Scholar search returned {len(organic_results)} results")
+    return organic_results
+
+def enrich_result(result: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """
+    Enrich one Google Scholar result with Semantic Scholar data.
+    Returns None when the paper has no Semantic Scholar ID.
+    """
+    paper_info = {
+        "title": result.get("title"),
+        "link": result.get("link"),
+        "snippet": result.get("snippet"),
+        "source": result.get("source"),
+        "id": result.get("result_id"),
+        "cited_by_count": 0,
+        "year": None,
+        "authors": [],
+        "abstract": result.get("snippet")
+    }
+    
+    # Get more detailed information from Semantic Scholar API
+    semantic_scholar_id = None
+    if settings.serpapi_key and result.get("title"):
+        logger.info(f"Fetching Semantic Scholar data for: {result['title']}")
+        semantic_data = get_semantic_scholar_data(result["title"])
+        if semantic_data:
+            logger.info("Successfully retrieved Semantic Scholar data")
+            semantic_scholar_id = semantic_data.get("paperId")
+            paper_info.update({
+                "title": semantic_data.get("title", paper_info["title"]),
+                "abstract": semantic_data.get("abstract", paper_info["abstract"]),
+                "year": semantic_data.get("year"),
+                "cited_by_count": semantic_data.get("citationCount", 0),
+                "authors": [author["name"] for author in semantic_data.get("authors", [])],
+                "paperId": semantic_scholar_id  # Add Semantic Scholar ID
+            })
+        else:
+            logger.info("No Semantic Scholar data found for this paper")
+    
+    # If we found a Semantic Scholar ID, use it; otherwise skip this paper
+    if not semantic_scholar_id:
+        logger.info("Skipping paper due to missing Semantic Scholar ID")
+        return None
+    paper_info["id"] = semantic_scholar_id
+    return paper_info
+
 def extract_keywords(query: str) -> str:
     """Extract English keywords from Chinese query using LLM API"""
     logger.info(f"Extracting keywords from query: {query}")
     try:
-        # Initialize OpenAI client with DashScope
-        client = OpenAI(
-            api_key=settings.dashscope_api_key,
-            base_url="https://dashscope.aliyuncs.com/compatible-mode/v1",
-        )
+        client = get_dashscope_client()
         
         # Create prompt for keyword extraction
         prompt = f"""
@@ -163,18 +515,24 @@ def extract_keywords(query: str) -> str:
         """
         
         # Call LLM API
-        completion = client.chat.completions.create(
-            model="qwen-plus-2025-07-28",
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that extracts English keywords from Chinese queries for academic search."},
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.3,
-            max_tokens=100,
-        )
+        messages = [
+            {"role": "system", "content": "You are a helpful assistant that extracts English keywords from Chinese queries for academic search."},
+            {"role": "user", "content": prompt},
+        ]
+        with guarded_call("dashscope"):
+            content = recorded_call(
+                "dashscope",
+                {"method": "chat.completions", "params": {"model": "qwen-plus-2025-07-28", "messages": json.dumps(messages, ensure_ascii=False)}},
+                lambda: client.chat.completions.create(
+                    model="qwen-plus-2025-07-28",
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=100,
+                ).choices[0].message.content
+            )
         
         # Extract keywords from response
-        keywords = completion.choices[0].message.content.strip()
+        keywords = content.strip()
         logger.info(f"Extracted keywords: {keywords}")
         return keywords
     
@@ -183,45 +541,53 @@ def extract_keywords(query: str) -> str:
         # If keyword extraction fails, return the original query
         return query
 
+# Fields of Semantic Scholar search results, enough to serve them as search results directly
+S2_SEARCH_FIELDS = "title,abstract,year,authors,citationCount,paperId,url"
+
+def search_semantic_scholar(english_query: str, max_results: int) -> List[Dict[str, Any]]:
+    """Run the query against Semantic Scholar's own search, returning papers in search result form"""
+    logger.info("Performing Semantic Scholar search")
+    params = {"query": english_query, "limit": min(max_results, 100), "fields": S2_SEARCH_FIELDS}
+    with timed("s2_search"):
+        data = s2_get("/paper/search", params)
+    if data is None:
+        raise RuntimeError("Semantic Scholar search is unavailable")
+    papers = []
+    for paper_data in data.get("data") or []:
+        if not paper_data.get("paperId"):
+            continue
+        remember_title(paper_data)
+        papers.append({
+            "title": paper_data.get("title"),
+            "link": paper_data.get("url"),
+            "snippet": paper_data.get("abstract"),
+            "source": "semantic_scholar",
+            "id": paper_data["paperId"],
+            "cited_by_count": paper_data.get("citationCount", 0),
+            "year": paper_data.get("year"),
+            "authors": [author["name"] for author in paper_data.get("authors", [])],
+            "abstract": paper_data.get("abstract"),
+            "paperId": paper_data["paperId"]
+        })
+    logger.info(f"Semantic Scholar search returned {len(papers)} results")
+    return papers
+
 def get_semantic_scholar_data(title: str) -> Optional[Dict[str, Any]]:
     """Get detailed paper information from Semantic Scholar API"""
     logger.info(f"Getting Semantic Scholar data for title: {title}")
     try:
-        headers = {"User-Agent": "ScholarAssistant/1.0"}
-        
         # Search for the paper by title
-        search_url = f"{SEMANTIC_SCHOLAR_API}/paper/search"
         params = {
             "query": title,
             "limit": 1,
             "fields": "title,abstract,year,authors,citationCount,paperId"
         }
-        logger.info(f"Making request to Semantic Scholar search API: {search_url}")
-        
-        # Try up to 5 times with exponential backoff
-        max_retries = 5
-        for attempt in range(max_retries):
-            response = requests.get(search_url, params=params, headers=headers)
-            # Handle rate limiting
-            if response.status_code == 429:
-                wait_time = 5 * (2 ** attempt)  # Exponential backoff: 5, 10, 20, 40, 80 seconds
-                logger.warning(f"Rate limit exceeded. Attempt {attempt + 1}/{max_retries}. Waiting for {wait_time} seconds before retry...")
-                import time
-                time.sleep(wait_time)
-                continue
-            else:
-                # Add a small delay to avoid rate limiting
-                import time
-                time.sleep(0.5)
-                break
-        else:
+        search_results = s2_get("/paper/search", params)
+        if search_results is None:
             # If we've exhausted all retries
-            logger.error(f"Failed to get Semantic Scholar data after {max_retries} attempts due to rate limiting")
+            logger.error("Failed to get Semantic Scholar data due to rate limiting")
             return None
         
-        response.raise_for_status()
-        
-        search_results = response.json()
         logger.info(f"Semantic Scholar search returned {search_results.get('total', 0)} results")
         if search_results.get("total") == 0 or not search_results.get("data"):
             logger.info("No results found in Semantic Scholar")
@@ -229,11 +595,14 @@ def get_semantic_scholar_data(title: str) -> Optional[Dict[str, Any]]:
         
         paper_data = search_results["data"][0]
         logger.info(f"Found paper ID: {paper_data['paperId']}")
+        remember_title(paper_data)
         
         # Return the data directly since we already requested all needed fields
         logger.info("Successfully retrieved detailed paper information")
         return paper_data
     
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         logger.error(f"Error getting Semantic Scholar data: {str(e)}")
         return None
@@ -1,31 +1,89 @@
-import redis
 import json
+import logging
+import time
 from typing import Optional, Dict, Any
 from backend.config import settings
+from backend.timing import timed
+from backend.metrics import cache_requests, cache_writes, cache_namespace
+
+logger = logging.getLogger(__name__)
+
+# How long to stop talking to Redis after a connection failure
+RETRY_AFTER_SECONDS = 30
 
 class RedisCache:
     def __init__(self):
-        self.client = redis.Redis(
-            host=settings.redis_host,
-            port=settings.redis_port,
-            db=settings.redis_db
-        )
-    
+        self._client = None
+        self._unavailable_until = 0.0
+
+    @property
+    def client(self):
+        """The Redis client, built on first use so importing this module stays cheap"""
+        if self._client is None:
+            import redis
+            from redis.backoff import NoBackoff
+            from redis.retry import Retry
+            self._client = redis.Redis(
+                host=settings.redis_host,
+                port=settings.redis_port,
+                db=settings.redis_db,
+                socket_connect_timeout=1,
+                socket_timeout=1,
+                # No retries: redis-py's default retry policy turns a dead Redis
+                # into seconds of blocking per call instead of a quick miss
+                retry=Retry(NoBackoff(), 0)
+            )
+        return self._client
+
+    @property
+    def errors(self):
+        import redis
+        return redis.RedisError
+
+    def _available(self) -> bool:
+        return time.monotonic() >= self._unavailable_until
+
+    def _mark_unavailable(self, e: Exception):
+        logger.warning(f"Redis unavailable, caching disabled for {RETRY_AFTER_SECONDS}s: {str(e)}")
+        self._unavailable_until = time.monotonic() + RETRY_AFTER_SECONDS
+
     def get(self, key: str) -> Optional[Dict[str, Any]]:
-        """Retrieve a paper from cache"""
-        cached = self.client.get(key)
-        if cached:
-            return json.loads(cached)
-        return None
-    
+        """Retrieve a paper from cache (a miss if Redis is down)"""
+        namespace = cache_namespace(key)
+        if not self._available():
+            cache_requests.inc(namespace=namespace, result="error")
+            return None
+        with timed("cache_get"):
+            try:
+                cached = self.client.get(key)
+            except self.errors as e:
+                self._mark_unavailable(e)
+                cache_requests.inc(namespace=namespace, result="error")
+                return None
+            if cached:
+                cache_requests.inc(namespace=namespace, result="hit")
+                return json.loads(cached)
+            cache_requests.inc(namespace=namespace, result="miss")
+            return None
+
     def set(self, key: str, value: Dict[str, Any], ttl: int = 86400):
         """Store a paper in cache with TTL (default: 24 hours)"""
-        self.client.setex(key, ttl, json.dumps(value))
-    
+        namespace = cache_namespace(key)
+        if not self._available():
+            cache_writes.inc(namespace=namespace, result="error")
+            return
+        with timed("cache_set"):
+            try:
+                self.client.setex(key, ttl, json.dumps(value))
+                cache_writes.inc(namespace=namespace, result="ok")
+            except self.errors as e:
+                self._mark_unavailable(e)
+                cache_writes.inc(namespace=namespace, result="error")
+
     def delete(self, key: str):
         """Remove a paper from cache"""
         self.client.delete(key)
-    
+
     def clear(self):
         """Clear all cached papers"""
         self.client.flushdb()
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+from typing import Dict, Any, AsyncIterator, List, Optional
+from backend.api.search import iter_search_results
+from backend.api.graph import build_citation_graph, build_reference_graph
+from backend.semantic_scholar import parse_paper_identifier, match_title, fetch_paper
+from backend.profiling import profiled
+
+logger = logging.getLogger(__name__)
+
+HELP_TEXT = """
+        # Scholar Assistant Help
+
+        ## Available Commands:
+
+        1. **search [topic]** - Search for academic papers on a topic
+           Example: "search machine learning in healthcare"
+
+        2. **graph [paper title or id]** - Visualize a knowledge graph for a paper
+           Example: "graph Deep Learning for Medical Image Analysis"
+           Also accepts a DOI, arXiv id, Semantic Scholar id or paper URL, e.g. "graph arXiv:1706.03762"
+
+        3. **help** - Show this help information
+
+        ## Features:
+
+        - Search for academic papers using natural language queries
+        - Visualize citation and reference networks as interactive graphs
+        - Explore paper details including abstracts, authors, and publication year
+        - Save and export search results and knowledge graphs
+
+        Type a command to get started!
+        """
+
+WELCOME_TEXT = (
+    "Welcome to Scholar Assistant! Type 'help' to see available commands.\n\n"
+    "I can help you search for academic papers and visualize knowledge graphs of citation networks.\n\n"
+    "Try searching for a topic or asking for help to get started!"
+)
+
+async def process_message(message: str) -> Dict[str, Any]:
+    """
+    Handle a chat command in-process. The search and graph pipelines make
+    blocking upstream calls, so they run on worker threads (which keep the
+    request id context) instead of on the event loop.
+    """
+    logger.info(f"Processing message: {message}")
+    message = message.strip()
+    command, _, argument = message.partition(" ")
+    command = command.lower()
+    argument = argument.strip()
+
+    if command == "search" and argument:
+        return await chat_search(argument)
+    if command == "graph" and argument:
+        return await chat_graph(argument)
+    if message.lower() == "help":
+        return {"response": HELP_TEXT}
+    # Default response for unrecognized commands
+    return {"response": WELCOME_TEXT}
+
+async def chat_search(query: str, max_results: int = 50) -> Dict[str, Any]:
+    """Search for papers and format them as markdown"""
+    logger.info(f"Search query: {query}")
+    try:
+        papers = await asyncio.to_thread(profiled(lambda: list(iter_search_results(query, max_results))))
+    except Exception as e:
+        logger.error(f"Error searching for papers: {str(e)}")
+        return {"response": f"Error searching for papers: {str(e)}"}
+    return {"response": format_search_results(query, papers)}
+
+async def stream_message(message: str) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Like process_message, but yield the answer as events while it is produced:
+    {"type": "text", "text": ...} pieces to append, then optionally
+    {"type": "graph", "graph_data": ...}.
+    """
+    logger.info(f"Streaming message: {message}")
+    message = message.strip()
+    command, _, argument = message.partition(" ")
+    argument = argument.strip()
+
+    if command.lower() == "search" and argument:
+        async for event in stream_search(argument):
+            yield event
+        return
+    result = await process_message(message)
+    yield {"type": "text", "text": result["response"]}
+    if "graph_data" in result:
+        yield {"type": "graph", "graph_data": result["graph_data"]}
+
+async def stream_search(query: str, max_results: int = 50) -> AsyncIterator[Dict[str, Any]]:
+    """Yield each paper as soon as it is enriched instead of waiting for the whole list"""
+    logger.info(f"Streaming search query: {query}")
+    yield {"type": "text", "text": f"Searching for papers related to '{query}'...\n\n"}
+    papers = iter_search_results(query, max_results)
+    count = 0
+    try:
+        while True:
+            # Each step makes blocking upstream calls, so advance the generator on a worker thread
+            paper = await asyncio.to_thread(profiled(next), papers, None)
+            if paper is None:
+                break
+            count += 1
+            yield {"type": "text", "text": format_paper(count, paper)}
+    except Exception as e:
+        logger.error(f"Error searching for papers: {str(e)}")
+        yield {"type": "text", "text": f"Error searching for papers: {str(e)}"}
+        return
+    yield {"type": "text", "text": f"Found {count} papers related to '{query}'.\n\nType 'graph [paper title]' to visualize a knowledge graph for any paper."}
+
+def format_search_results(query: str, papers: List[Dict[str, Any]]) -> str:
+    result_text = f"Found {len(papers)} papers related to '{query}':\n\n"
+    for i, paper in enumerate(papers, 1):
+        result_text += format_paper(i, paper)
+    result_text += "\nType 'graph [paper title]' to visualize a knowledge graph for any paper."
+    return result_text
+
+def format_paper(index: int, paper: Dict[str, Any]) -> str:
+    text = f"{index}. **{paper['title']}**\n"
+    text += f"   Year: {paper['year'] or 'N/A'}\n"
+    text += f"   Citations: {paper['cited_by_count']}\n"
+    text += f"   Abstract: {paper['abstract'] or 'N/A'}\n"
+    text += f"   [Link]({paper['link']})\n\n"
+    return text
+
+async def chat_graph(argument: str) -> Dict[str, Any]:
+    """
+    Build the combined citation/reference graph for a paper given by
+    identifier (DOI, arXiv id, S2 id, URL) or by title
+    """
+    logger.info(f"Graph request for: {argument}")
+    try:
+        paper_id = parse_paper_identifier(argument)
+        if paper_id:
+            # Known id: go straight to the graph, fetching the root details alongside it
+            logger.info(f"Recognised paper identifier: {paper_id}")
+            return await paper_graph_response(paper_id, None, argument)
+
+        # Title: one index lookup or title-match call before the full search pipeline
+        match = await asyncio.to_thread(profiled(match_title), argument)
+        if match:
+            paper = {
+                "title": match.get("title"),
+                "year": match.get("year"),
+                "cited_by_count": match.get("citationCount") or 0
+            }
+            return await paper_graph_response(match["paperId"], paper, argument)
+
+        logger.info("No direct title match, falling back to full search")
+        paper = await asyncio.to_thread(profiled(lambda: next(iter_search_results(argument, 1), None)))
+        if not paper:
+            return {"response": f"No paper found with title '{argument}'"}
+
+        paper_id = paper.get('id') or paper.get('paperId')
+        if not paper_id:
+            return {"response": f"Could not find paper ID for '{argument}'"}
+
+        return await paper_graph_response(paper_id, paper, argument)
+
+    except Exception as e:
+        logger.error(f"Error generating graph: {str(e)}")
+        return {"response": f"Error generating graph: {str(e)}"}
+
+async def paper_graph_response(paper_id: str, paper: Optional[Dict[str, Any]], title: str) -> Dict[str, Any]:
+    """
+    Fetch citations and references concurrently and combine them into one
+    graph. Without paper details, they are fetched in the same round.
+    """
+    tasks = [
+        asyncio.to_thread(profiled(build_citation_graph), paper_id),
+        asyncio.to_thread(profiled(build_reference_graph), paper_id)
+    ]
+    if paper is None:
+        tasks.append(asyncio.to_thread(profiled(fetch_paper), paper_id))
+    citation_data, reference_data, *details = await asyncio.gather(*tasks)
+
+    if paper is None:
+        details = details[0] or {}
+        paper = {
+            "title": details.get("title") or title,
+            "year": details.get("year"),
+            "cited_by_count": details.get("citationCount") or 0
+        }
+        # External ids (DOI:..., ARXIV:...) become the canonical S2 id
+        canonical_id = details.get("paperId")
+        if canonical_id and canonical_id != paper_id:
+            citation_data = rename_node(citation_data, paper_id, canonical_id)
+            reference_data = rename_node(reference_data, paper_id, canonical_id)
+            paper_id = canonical_id
+
+    combined_graph = combine_graph(paper_id, paper, title, citation_data, reference_data)
+    return {
+        "response": f"Visualizing knowledge graph for paper: {paper.get('title') or title}",
+        "graph_data": combined_graph
+    }
+
+def rename_node(graph: Dict[str, Any], old_id: str, new_id: str) -> Dict[str, Any]:
+    """Point the links of a graph at new_id instead of old_id"""
+    links = [
+        {
+            **link,
+            "source": new_id if link["source"] == old_id else link["source"],
+            "target": new_id if link["target"] == old_id else link["target"]
+        }
+        for link in graph.get("links", [])
+    ]
+    return {**graph, "links": links}
+
+def combine_graph(paper_id: str, paper: Dict[str, Any], title: str,
+                  citation_data: Dict[str, Any], reference_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge citation and reference networks around a root node"""
+    # Create a set to track unique node IDs
+    node_ids = {paper_id}
+    combined_nodes = [{
+        "id": paper_id,
+        "type": "root",
+        "title": paper.get("title", title),
+        "cited_by_count": paper.get("cited_by_count", 0),
+        "year": paper.get("year")
+    }]
+    combined_links = []
+
+    for data in (citation_data, reference_data):
+        for node in data.get("nodes", []):
+            if node["id"] not in node_ids:
+                combined_nodes.append(node)
+                node_ids.add(node["id"])
+        combined_links.extend(data.get("links", []))
+
+    return {
+        "nodes": combined_nodes,
+        "links": combined_links
+    }
@@ -0,0 +1,143 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from backend.config import settings
+from backend.metrics import registry, upstream_call
+
+logger = logging.getLogger(__name__)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+
+# Gauge values of the states
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+circuit_state = registry.gauge(
+    "scholar_circuit_state", "Circuit breaker state per external API (0 closed, 1 half-open, 2 open)", ["api"]
+)
+circuit_transitions = registry.counter(
+    "scholar_circuit_transitions_total", "Circuit breaker state changes per external API", ["api", "state"]
+)
+circuit_rejected = registry.counter(
+    "scholar_circuit_rejected_total", "Calls refused without contacting the API because its circuit was open", ["api"]
+)
+
+class UpstreamUnavailable(RuntimeError):
+    """
+    Raised when an upstream gave no answer (rate limited on every attempt,
+    or its circuit is open), as opposed to answering with no results
+    """
+    def __init__(self, api: str, retry_after: float, message: Optional[str] = None):
+        super().__init__(message or f"{api} is unavailable (retry in {retry_after:.0f}s)")
+        self.api = api
+        self.retry_after = retry_after
+
+class CircuitOpenError(UpstreamUnavailable):
+    """Raised instead of calling an upstream whose circuit is open"""
+    def __init__(self, api: str, retry_after: float):
+        super().__init__(api, retry_after, f"{api} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+
+class CircuitBreaker:
+    """
+    Thread-safe circuit breaker for one upstream. failure_threshold
+    consecutive failures (429, 5xx, timeouts, connection errors) open it,
+    and every call is refused for reset_timeout seconds. Then a single
+    probe is let through (half-open): success closes the circuit, failure
+    opens it again.
+    """
+    def __init__(self, api: str, failure_threshold: int, reset_timeout: float):
+        self.api = api
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        circuit_state.set(STATE_VALUES[CLOSED], api=api)
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the next call may go through; 0 when one may go now"""
+        with self._lock:
+            if self._state == CLOSED:
+                return 0.0
+            if self._state == HALF_OPEN:
+                # The probe's outcome decides, so check again shortly
+                return 1.0 if self._probing else 0.0
+            return max(self._opened_at + self.reset_timeout - time.monotonic(), 0.0)
+
+    def allow_request(self) -> bool:
+        """Admit a call; in half-open state only one probe at a time is admitted"""
+        with self._lock:
+            if self._state == OPEN:
+                if time.monotonic() < self._opened_at + self.reset_timeout:
+                    return False
+                self._transition(HALF_OPEN)
+            if self._state == HALF_OPEN:
+                if self._probing:
+                    return False
+                self._probing = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._probing = False
+            if self._state != CLOSED:
+                self._transition(CLOSED)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._probing = False
+            if self._state == HALF_OPEN or (self._state == CLOSED and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
+
+    def _transition(self, state: str):
+        self._state = state
+        circuit_state.set(STATE_VALUES[state], api=self.api)
+        circuit_transitions.inc(api=self.api, state=state)
+        if state == OPEN:
+            logger.warning(f"Circuit for {self.api} opened after {self._failures} failures, "
+                           f"refusing calls for {self.reset_timeout:.0f}s")
+        else:
+            logger.info(f"Circuit for {self.api} is now {state}")
+
+breakers: Dict[str, CircuitBreaker] = {
+    api: CircuitBreaker(api, settings.circuit_failure_threshold, settings.circuit_reset_seconds)
+    for api in ("semantic_scholar", "serpapi", "dashscope")
+}
+
+def is_failure(status) -> bool:
+    """Whether an upstream_call status means the upstream is struggling (404s and other 4xx do not)"""
+    status = str(status)
+    return status in ("429", "error") or (status.isdigit() and int(status) >= 500)
+
+@contextmanager
+def guarded_call(api: str) -> Iterator[Any]:
+    """
+    upstream_call behind the API's circuit breaker: raises CircuitOpenError
+    without calling the API while its circuit is open, and otherwise feeds
+    the outcome (call.status, or any exception) to the breaker.
+    """
+    breaker = breakers[api]
+    if not breaker.allow_request():
+        circuit_rejected.inc(api=api)
+        raise CircuitOpenError(api, breaker.retry_after())
+    failed = True
+    try:
+        with upstream_call(api) as call:
+            yield call
+        failed = is_failure(call.status)
+    finally:
+        if failed:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
@@ -10,11 +10,86 @@ class Settings(BaseModel):
     serpapi_key: str = os.getenv("SERPAPI_KEY", "")
     dashscope_api_key: str = os.getenv("DASHSCOPE_API_KEY", "")
     
+    # Upstream base URLs (overridden to point at local stand-ins, e.g. for benchmarks)
+    semantic_scholar_api: str = os.getenv("SEMANTIC_SCHOLAR_API", "https://api.semanticscholar.org/graph/v1")
+    serpapi_base_url: str = os.getenv("SERPAPI_BASE_URL", "https://serpapi.com")
+    dashscope_base_url: str = os.getenv("DASHSCOPE_BASE_URL", "https://dashscope.aliyuncs.com/compatible-mode/v1")
+    
+    # Archive of raw SerpAPI responses (segment files + index), with retention limits
+    search_archive_dir: str = os.getenv("SEARCH_ARCHIVE_DIR", "search_results")
+    search_archive_segment_mb: int = int(os.getenv("SEARCH_ARCHIVE_SEGMENT_MB", 16))
+    search_archive_max_mb: int = int(os.getenv("SEARCH_ARCHIVE_MAX_MB", 512))
+    search_archive_max_days: float = float(os.getenv("SEARCH_ARCHIVE_MAX_DAYS", 30))
+    search_archive_queue_size: int = int(os.getenv("SEARCH_ARCHIVE_QUEUE_SIZE", 1000))
+    
+    # Search mode: "serpapi" (Google Scholar, enriched per paper) or "hedged" (also
+    # Semantic Scholar's own search when SerpAPI has not answered after the hedge delay)
+    search_mode: str = os.getenv("SEARCH_MODE", "serpapi")
+    search_hedge_delay_ms: float = float(os.getenv("SEARCH_HEDGE_DELAY_MS", 800))
+    
+    # Local full-text index of every paper seen in Semantic Scholar responses, and
+    # whether searches fall back to it when SerpAPI fails or the time budget runs out
+    paper_index_path: str = os.getenv("PAPER_INDEX_PATH", "paper_index/papers.sqlite")
+    paper_index_queue_size: int = int(os.getenv("PAPER_INDEX_QUEUE_SIZE", 10000))
+    search_local_fallback: bool = os.getenv("SEARCH_LOCAL_FALLBACK", "True").lower() == "true"
+    
+    # Reranking of search results: BM25 relevance to the query plus weighted
+    # citation and recency features (recency halves every half-life years)
+    search_rerank: bool = os.getenv("SEARCH_RERANK", "False").lower() == "true"
+    rerank_citation_weight: float = float(os.getenv("RERANK_CITATION_WEIGHT", 0.3))
+    rerank_recency_weight: float = float(os.getenv("RERANK_RECENCY_WEIGHT", 0.2))
+    rerank_recency_half_life: float = float(os.getenv("RERANK_RECENCY_HALF_LIFE", 5))
+    
+    # Upstream record/replay: "live", "record" (call upstreams and archive responses)
+    # or "replay" (serve archived responses only); a latency scale of 1 replays recorded timings
+    upstream_mode: str = os.getenv("UPSTREAM_MODE", "live")
+    replay_archive: str = os.getenv("REPLAY_ARCHIVE", "replay/upstream.sqlite")
+    replay_latency_scale: float = float(os.getenv("REPLAY_LATENCY_SCALE", 0))
+    
     # Redis Configuration
     redis_host: str = os.getenv("REDIS_HOST", "localhost")
     redis_port: int = int(os.getenv("REDIS_PORT", 6379))
     redis_db: int = int(os.getenv("REDIS_DB", 0))
     
+    # Upstream rate limiting
+    s2_requests_per_second: float = float(os.getenv("S2_REQUESTS_PER_SECOND", 2))
+    
+    # Batch jobs
+    jobs_dir: str = os.getenv("JOBS_DIR", "jobs")
+    job_workers: int = int(os.getenv("JOB_WORKERS", 4))
+    # A crawl retries a paper Semantic Scholar did not answer for with growing
+    # delays (up to the max), and pauses after this many attempts in a row
+    crawl_retry_limit: int = int(os.getenv("CRAWL_RETRY_LIMIT", 5))
+    crawl_retry_max_seconds: float = float(os.getenv("CRAWL_RETRY_MAX_SECONDS", 300))
+    
+    # WebSocket log streaming
+    ws_queue_size: int = int(os.getenv("WS_QUEUE_SIZE", 256))
+    ws_overflow_policy: str = os.getenv("WS_OVERFLOW_POLICY", "drop_oldest")
+    ws_max_pending: int = int(os.getenv("WS_MAX_PENDING", 10000))
+    ws_batch_window_ms: int = int(os.getenv("WS_BATCH_WINDOW_MS", 75))
+    ws_batch_max: int = int(os.getenv("WS_BATCH_MAX", 200))
+    # "local" delivers within this process; "redis" relays through Redis pub/sub for multiple workers
+    ws_backplane: str = os.getenv("WS_BACKPLANE", "local")
+    ws_backplane_channel: str = os.getenv("WS_BACKPLANE_CHANNEL", "scholar:ws:logs")
+    
+    # Minimum seconds between progress events of one stage
+    progress_min_interval: float = float(os.getenv("PROGRESS_MIN_INTERVAL", 0.25))
+    
+    # Request profiling (disabled unless an admin token is set)
+    profiling_token: str = os.getenv("PROFILING_TOKEN", "")
+    profiles_dir: str = os.getenv("PROFILES_DIR", "profiles")
+    profile_keep: int = int(os.getenv("PROFILE_KEEP", 50))
+    
+    # Upstream failure handling: request timeout in seconds, and circuit breakers
+    # that refuse calls to an API for CIRCUIT_RESET_SECONDS after
+    # CIRCUIT_FAILURE_THRESHOLD consecutive 429s, 5xx responses or timeouts
+    upstream_timeout: float = float(os.getenv("UPSTREAM_TIMEOUT", 30))
+    circuit_failure_threshold: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 3))
+    circuit_reset_seconds: float = float(os.getenv("CIRCUIT_RESET_SECONDS", 30))
+    
+    # Build the SerpAPI and DashScope clients at startup instead of on the first search
+    preload_clients: bool = os.getenv("PRELOAD_CLIENTS", "False").lower() == "true"
+    
     # Application settings
     debug_mode: bool = os.getenv("DEBUG", "False").lower() == "true"
 
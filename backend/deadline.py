@@ -0,0 +1,85 @@
+import asyncio
+import base64
+import binascii
+import contextvars
+import json
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+from backend.profiling import profiled
+
+class DeadlineExceeded(Exception):
+    """Raised by work that would start after the request's time budget has run out"""
+
+class Deadline:
+    """Point in time by which a request wants its answer"""
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+# Deadline of the request the current code is working for (None: no time budget)
+deadline_var: contextvars.ContextVar[Optional[Deadline]] = contextvars.ContextVar("deadline", default=None)
+
+def current_deadline() -> Optional[Deadline]:
+    return deadline_var.get()
+
+def deadline_expired() -> bool:
+    deadline = deadline_var.get()
+    return deadline is not None and deadline.expired()
+
+def check_deadline():
+    """Raise DeadlineExceeded before starting new work once the time budget is used up"""
+    if deadline_expired():
+        raise DeadlineExceeded(f"Time budget of {deadline_var.get().budget}s exceeded")
+
+@contextmanager
+def request_deadline(seconds: Optional[float]) -> Iterator[Optional[Deadline]]:
+    """Give the enclosed work (and the threads it starts) a time budget; no-op for None"""
+    if seconds is None:
+        yield None
+        return
+    deadline = Deadline(seconds)
+    token = deadline_var.set(deadline)
+    try:
+        yield deadline
+    finally:
+        deadline_var.reset(token)
+
+async def run_until_deadline(func: Callable[..., Any], *args: Any) -> Tuple[bool, Any]:
+    """
+    Run blocking func on a worker thread and wait for it until the current
+    deadline. Returns (True, result) when it finished in time, otherwise
+    (False, None) and leaves it running: the call in flight still completes
+    (and fills the cache), and the deadline stops it from starting new ones.
+    """
+    task = asyncio.ensure_future(asyncio.to_thread(profiled(func), *args))
+    deadline = deadline_var.get()
+    if deadline is None:
+        return True, await task
+    try:
+        return True, await asyncio.wait_for(asyncio.shield(task), deadline.remaining())
+    except asyncio.TimeoutError:
+        # Nobody awaits the task any more; retrieve its outcome so errors are not reported as unhandled
+        task.add_done_callback(lambda finished: finished.cancelled() or finished.exception())
+        return False, None
+
+def encode_continuation(state: Dict[str, Any]) -> str:
+    """Opaque, URL-safe token carrying what a partial response still has to do"""
+    data = json.dumps(state, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(data).decode("ascii").rstrip("=")
+
+def decode_continuation(token: str, kind: str) -> Dict[str, Any]:
+    """Decode a token from encode_continuation; ValueError if it is malformed or for another endpoint"""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, UnicodeDecodeError, json.JSONDecodeError):
+        raise ValueError("Malformed continuation token")
+    if not isinstance(state, dict) or state.get("kind") != kind:
+        raise ValueError(f"Continuation token is not for a {kind} request")
+    return state
@@ -0,0 +1,175 @@
+import csv
+import io
+import json
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+# Flush buffered output once it grows past this many characters
+CHUNK_SIZE = 64 * 1024
+
+# Node attributes written by the XML exporters: (name, GraphML type, GEXF type)
+NODE_ATTRIBUTES = [
+    ("title", "string", "string"),
+    ("year", "int", "integer"),
+    ("cited_by_count", "int", "integer"),
+    ("type", "string", "string"),
+]
+
+# Columns written by the search results CSV exporter
+SEARCH_COLUMNS = ["query", "paperId", "title", "year", "cited_by_count", "authors", "source", "link", "abstract"]
+
+SEARCH_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+GRAPH_MEDIA_TYPES = {
+    "graphml": ("application/xml", "graphml"),
+    "gexf": ("application/xml", "gexf"),
+    "csv": ("text/csv", "csv"),
+    "jsonl": ("application/x-ndjson", "jsonl"),
+}
+
+def chunked(pieces: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """Join small string pieces into chunks of roughly chunk_size characters"""
+    buffer: List[str] = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buffer).encode("utf-8")
+            buffer = []
+            size = 0
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+def unique_nodes(nodes: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Drop repeated node ids, keeping the first occurrence"""
+    seen = set()
+    for node in nodes:
+        node_id = node.get("id")
+        if not node_id or node_id in seen:
+            continue
+        seen.add(node_id)
+        yield node
+
+def _graphml_pieces(nodes: Iterable[Dict[str, Any]], links: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<graphml xmlns="http://graphml.graphdrawing.org/xmlns">\n'
+    for name, graphml_type, _ in NODE_ATTRIBUTES:
+        yield f'  <key id="{name}" for="node" attr.name="{name}" attr.type="{graphml_type}"/>\n'
+    yield '  <key id="edge_type" for="edge" attr.name="type" attr.type="string"/>\n'
+    yield '  <graph id="G" edgedefault="directed">\n'
+    for node in nodes:
+        yield f'    <node id={quoteattr(str(node["id"]))}>'
+        for name, _, _ in NODE_ATTRIBUTES:
+            if node.get(name) is not None:
+                yield f'<data key="{name}">{escape(str(node[name]))}</data>'
+        yield '</node>\n'
+    for link in links:
+        yield f'    <edge source={quoteattr(str(link["source"]))} target={quoteattr(str(link["target"]))}>'
+        if link.get("type") is not None:
+            yield f'<data key="edge_type">{escape(str(link["type"]))}</data>'
+        yield '</edge>\n'
+    yield '  </graph>\n'
+    yield '</graphml>\n'
+
+def _gexf_pieces(nodes: Iterable[Dict[str, Any]], links: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<gexf xmlns="http://gexf.net/1.2" version="1.2">\n'
+    yield '  <graph defaultedgetype="directed">\n'
+    yield '    <attributes class="node">\n'
+    for index, (name, _, gexf_type) in enumerate(NODE_ATTRIBUTES):
+        yield f'      <attribute id="{index}" title="{name}" type="{gexf_type}"/>\n'
+    yield '    </attributes>\n'
+    yield '    <nodes>\n'
+    for node in nodes:
+        label = node.get("title") or node["id"]
+        yield f'      <node id={quoteattr(str(node["id"]))} label={quoteattr(str(label))}><attvalues>'
+        for index, (name, _, _) in enumerate(NODE_ATTRIBUTES):
+            if node.get(name) is not None:
+                yield f'<attvalue for="{index}" value={quoteattr(str(node[name]))}/>'
+        yield '</attvalues></node>\n'
+    yield '    </nodes>\n'
+    yield '    <edges>\n'
+    for index, link in enumerate(links):
+        label = f' label={quoteattr(str(link["type"]))}' if link.get("type") is not None else ""
+        yield f'      <edge id="{index}" source={quoteattr(str(link["source"]))} target={quoteattr(str(link["target"]))}{label}/>\n'
+    yield '    </edges>\n'
+    yield '  </graph>\n'
+    yield '</gexf>\n'
+
+def _edge_csv_pieces(links: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["source", "target", "type"])
+    yield buffer.getvalue()
+    for link in links:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerow([link["source"], link["target"], link.get("type", "")])
+        yield buffer.getvalue()
+
+def _graph_jsonl_pieces(nodes: Iterable[Dict[str, Any]], links: Iterable[Dict[str, Any]]) -> Iterator[str]:
+    for node in nodes:
+        yield json.dumps({"kind": "node", **node}, ensure_ascii=False) + "\n"
+    for link in links:
+        yield json.dumps({"kind": "edge", **link}, ensure_ascii=False) + "\n"
+
+def iter_graph_export(fmt: str, nodes: Iterable[Dict[str, Any]], links: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """
+    Stream a graph in the given format. Nodes are consumed completely before
+    links, so both may be lazy iterators over a store; nothing is held in
+    memory beyond the current chunk and the set of node ids already written.
+    """
+    nodes = unique_nodes(nodes)
+    if fmt == "graphml":
+        return chunked(_graphml_pieces(nodes, links))
+    if fmt == "gexf":
+        return chunked(_gexf_pieces(nodes, links))
+    if fmt == "csv":
+        return chunked(_edge_csv_pieces(links))
+    if fmt == "jsonl":
+        return chunked(_graph_jsonl_pieces(nodes, links))
+    raise ValueError(f"Unsupported graph export format: {fmt}")
+
+def graph_export_headers(fmt: str, name: str) -> Dict[str, str]:
+    """Content-Disposition header for a graph download"""
+    _, extension = GRAPH_MEDIA_TYPES[fmt]
+    return {"Content-Disposition": f'attachment; filename="{name}.{extension}"'}
+
+def graph_media_type(fmt: str) -> Optional[str]:
+    entry = GRAPH_MEDIA_TYPES.get(fmt)
+    return entry[0] if entry else None
+
+def iter_search_export(fmt: str, rows: Iterable[Tuple[str, Dict[str, Any]]]) -> Iterator[bytes]:
+    """
+    Stream (query, paper) rows as CSV or JSONL. Every row is flushed as soon as
+    it is produced, because each one may have taken an upstream round trip.
+    """
+    if fmt == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(SEARCH_COLUMNS)
+        yield buffer.getvalue().encode("utf-8")
+        for query, paper in rows:
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerow([
+                query,
+                paper.get("paperId") or paper.get("id"),
+                paper.get("title"),
+                paper.get("year"),
+                paper.get("cited_by_count"),
+                "; ".join(paper.get("authors") or []),
+                paper.get("source"),
+                paper.get("link"),
+                paper.get("abstract"),
+            ])
+            yield buffer.getvalue().encode("utf-8")
+    elif fmt == "jsonl":
+        for query, paper in rows:
+            yield (json.dumps({"query": query, **paper}, ensure_ascii=False) + "\n").encode("utf-8")
+    else:
+        raise ValueError(f"Unsupported search export format: {fmt}")
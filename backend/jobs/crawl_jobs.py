@@ -0,0 +1,376 @@
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Iterator, List, Optional
+from backend.api.graph import process_citation_data, process_reference_data, PATH_FIELDS
+from backend.cache.redis_cache import cache
+from backend.circuit_breaker import UpstreamUnavailable
+from backend.config import settings
+from backend.jobs.store import JobStore
+from backend.request_context import request_id_var
+from backend.semantic_scholar import fetch_citations, fetch_references
+
+logger = logging.getLogger(__name__)
+
+# Crawl job states that will not change any more
+FINISHED_STATES = {"completed", "cancelled", "failed"}
+
+# Number of progress events kept in memory per job
+MAX_EVENTS = 100
+
+class CrawlJobManager:
+    """
+    Breadth-first citation/reference crawls that run in the background.
+
+    Nodes and links are appended to per-job JSONL files, and the frontier
+    and file sizes are checkpointed after every expansion, so a crawl can be
+    paused, resumed or picked up again after a restart without repeating or
+    duplicating work. The visited set is not checkpointed: on resume it is
+    rebuilt from the node file, which holds exactly the visited papers. A finished crawl is materialized into a
+    single graph file (and the Redis cache) for fast retrieval.
+    """
+    def __init__(self, store: JobStore, workers: int):
+        self.store = store
+        self.workers = workers
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self.events: Dict[str, deque] = {}
+        # Job id -> requested control action ("pause" or "cancel")
+        self.controls: Dict[str, str] = {}
+        self.lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="crawl-job")
+        return self._executor
+
+    def _file(self, job_id: str, suffix: str) -> str:
+        return os.path.join(self.store.directory, f"{job_id}.{suffix}")
+
+    def submit(self, paper_id: str, direction: str = "both", max_depth: int = 2,
+               max_nodes: int = 500, fan_out: int = 100) -> Dict[str, Any]:
+        """Create a crawl job rooted at paper_id and start it"""
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "status": "queued",
+            "created_at": now,
+            "updated_at": now,
+            "root": paper_id,
+            "direction": direction,
+            "max_depth": max_depth,
+            "max_nodes": max_nodes,
+            "fan_out": fan_out,
+            "frontier": [[paper_id, 0]],
+            "expanded": 0,
+            "node_count": 1,
+            "link_count": 0,
+            "offsets": {"nodes": 0, "links": 0},
+            "error": None
+        }
+        os.makedirs(self.store.directory, exist_ok=True)
+        with open(self._file(job["id"], "nodes.jsonl"), 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"id": paper_id, "type": "root"}) + "\n")
+            job["offsets"]["nodes"] = f.tell()
+        open(self._file(job["id"], "links.jsonl"), 'w').close()
+        with self.lock:
+            self.jobs[job["id"]] = job
+            self.store.save(job)
+        logger.info(f"Submitted crawl job {job['id']} for paper {paper_id}, direction: {direction}, max_depth: {max_depth}, max_nodes: {max_nodes}")
+        self._start(job)
+        return job
+
+    def resume_pending(self):
+        """Restart crawls that were queued or running when the process stopped"""
+        for job in self.store.list():
+            if job["status"] in ("queued", "running"):
+                with self.lock:
+                    self.jobs[job["id"]] = job
+                logger.info(f"Resuming crawl job {job['id']}")
+                self._start(job)
+
+    def _start(self, job: Dict[str, Any]):
+        with self.lock:
+            job["status"] = "queued"
+            job["error"] = None
+            self.controls.pop(job["id"], None)
+        self._emit(job)
+        self.executor.submit(self._run, job["id"])
+
+    def pause(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._control(job_id, "pause")
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._control(job_id, "cancel")
+
+    def _control(self, job_id: str, action: str) -> Optional[Dict[str, Any]]:
+        job = self.get(job_id)
+        if job is None or job["status"] in FINISHED_STATES:
+            return job
+        with self.lock:
+            self.jobs.setdefault(job_id, job)
+            if job["status"] in ("queued", "running"):
+                # The worker applies the action after its current expansion
+                self.controls[job_id] = action
+                return job
+            # A paused job has no worker, so apply the action directly
+            if action == "cancel":
+                job["status"] = "cancelled"
+                job["updated_at"] = time.time()
+                self.store.save(job)
+        self._emit(job)
+        return job
+
+    def resume(self, job_id: str) -> Optional[Dict[str, Any]]:
+        job = self.get(job_id)
+        if job is None:
+            return None
+        if job["status"] == "paused":
+            with self.lock:
+                self.jobs.setdefault(job_id, job)
+            logger.info(f"Resuming crawl job {job_id}")
+            self._start(job)
+        return job
+
+    def _run(self, job_id: str):
+        # Worker threads log to the job's channel
+        token = request_id_var.set(f"job:{job_id}")
+        try:
+            self._run_in_context(job_id)
+        finally:
+            request_id_var.reset(token)
+
+    def _run_in_context(self, job_id: str):
+        with self.lock:
+            job = self.jobs[job_id]
+            if job["status"] != "queued":
+                return
+            if job_id in self.controls:
+                self._apply_control(job)
+                return
+            job["status"] = "running"
+        self._emit(job)
+
+        nodes_path = self._file(job_id, "nodes.jsonl")
+        links_path = self._file(job_id, "links.jsonl")
+        try:
+            # Drop anything written after the last checkpoint
+            for path, key in ((nodes_path, "nodes"), (links_path, "links")):
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.truncate(job["offsets"][key])
+
+            # Checkpoints written before the visited set was dropped still carry it
+            with self.lock:
+                job.pop("visited", None)
+            visited = {node["id"] for node in self.iter_nodes(job_id)}
+            frontier = deque(job["frontier"])
+            # With direction "both" the same link is seen from either end
+            seen_links = {(link["source"], link["target"]) for link in self.iter_links(job_id)}
+            failures = 0
+            while frontier:
+                with self.lock:
+                    if job_id in self.controls:
+                        job["frontier"] = list(frontier)
+                        self._apply_control(job)
+                        return
+
+                paper_id, depth = frontier[0]
+                try:
+                    new_nodes, new_links = self._expand(job, paper_id)
+                except UpstreamUnavailable as e:
+                    # Not a paper without neighbours: keep it at the head of the frontier
+                    failures += 1
+                    if failures >= settings.crawl_retry_limit:
+                        self._pause_unavailable(job, frontier, f"Paused after {failures} attempts to expand {paper_id}: {str(e)}")
+                        return
+                    delay = max(e.retry_after, min(5 * 2 ** (failures - 1), settings.crawl_retry_max_seconds))
+                    logger.info(f"Crawl job {job_id} retrying {paper_id} in {delay:.0f}s: {str(e)}")
+                    self._wait(job_id, delay)
+                    continue
+                failures = 0
+                frontier.popleft()
+                added_nodes = []
+                for node in new_nodes:
+                    if node["id"] in visited or len(visited) >= job["max_nodes"]:
+                        continue
+                    visited.add(node["id"])
+                    added_nodes.append(node)
+                    if depth + 1 < job["max_depth"]:
+                        frontier.append([node["id"], depth + 1])
+                # Keep only new links between papers that made it into the graph
+                added_links = []
+                for link in new_links:
+                    key = (link["source"], link["target"])
+                    if key in seen_links or link["source"] not in visited or link["target"] not in visited:
+                        continue
+                    seen_links.add(key)
+                    added_links.append(link)
+
+                with open(nodes_path, 'a', encoding='utf-8') as f:
+                    for node in added_nodes:
+                        f.write(json.dumps(node, ensure_ascii=False) + "\n")
+                    nodes_offset = f.tell()
+                with open(links_path, 'a', encoding='utf-8') as f:
+                    for link in added_links:
+                        f.write(json.dumps(link, ensure_ascii=False) + "\n")
+                    links_offset = f.tell()
+
+                with self.lock:
+                    job["frontier"] = list(frontier)
+                    job["expanded"] += 1
+                    job["node_count"] += len(added_nodes)
+                    job["link_count"] += len(added_links)
+                    job["offsets"] = {"nodes": nodes_offset, "links": links_offset}
+                    job["updated_at"] = time.time()
+                    self.store.save(job)
+                self._emit(job, current=paper_id, depth=depth)
+
+            self._materialize(job)
+            with self.lock:
+                job["status"] = "completed"
+                job["updated_at"] = time.time()
+                self.store.save(job)
+            logger.info(f"Crawl job {job_id} completed with {job['node_count']} nodes and {job['link_count']} links")
+        except Exception as e:
+            logger.error(f"Crawl job {job_id} failed: {str(e)}")
+            with self.lock:
+                job["status"] = "failed"
+                job["error"] = str(e)
+                job["updated_at"] = time.time()
+                self.store.save(job)
+        self._emit(job)
+
+    def _wait(self, job_id: str, seconds: float):
+        """Sleep before a retry, waking up early for a pause or cancel request"""
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline and job_id not in self.controls:
+            time.sleep(min(0.5, max(deadline - time.monotonic(), 0)))
+
+    def _pause_unavailable(self, job: Dict[str, Any], frontier: deque, error: str):
+        """Pause a crawl Semantic Scholar keeps not answering for; resume continues with the same paper"""
+        logger.warning(f"Crawl job {job['id']}: {error}")
+        with self.lock:
+            job["frontier"] = list(frontier)
+            job["status"] = "paused"
+            job["error"] = error
+            job["updated_at"] = time.time()
+            self.store.save(job)
+        self._emit(job)
+
+    def _apply_control(self, job: Dict[str, Any]):
+        """Apply a pending pause/cancel request; must be called with the lock held"""
+        action = self.controls.pop(job["id"], None)
+        if action == "cancel":
+            job["status"] = "cancelled"
+        elif action == "pause":
+            job["status"] = "paused"
+        job["updated_at"] = time.time()
+        self.store.save(job)
+        logger.info(f"Crawl job {job['id']} {job['status']}")
+        self.events.setdefault(job["id"], deque(maxlen=MAX_EVENTS)).append(self._event(job))
+
+    def _expand(self, job: Dict[str, Any], paper_id: str):
+        """
+        Fetch the neighbours of one paper in the configured direction(s).
+        Raises UpstreamUnavailable when Semantic Scholar gives no answer.
+        """
+        nodes: List[Dict[str, Any]] = []
+        links: List[Dict[str, Any]] = []
+        if job["direction"] in ("citations", "both"):
+            data = process_citation_data(fetch_citations(paper_id, limit=job["fan_out"], fields=PATH_FIELDS), paper_id)
+            nodes.extend(data["nodes"])
+            links.extend(data["links"])
+        if job["direction"] in ("references", "both"):
+            data = process_reference_data(fetch_references(paper_id, limit=job["fan_out"], fields=PATH_FIELDS), paper_id)
+            nodes.extend(data["nodes"])
+            links.extend(data["links"])
+        return nodes, links
+
+    def _materialize(self, job: Dict[str, Any]):
+        """Write the finished graph as one JSON document and cache it"""
+        graph = {"nodes": list(self.iter_nodes(job["id"])), "links": list(self.iter_links(job["id"]))}
+        path = self._file(job["id"], "graph.json")
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(graph, f, ensure_ascii=False)
+        os.replace(f"{path}.tmp", path)
+        cache.set(f"graph:crawl:{job['id']}", graph)
+
+    def _event(self, job: Dict[str, Any], **extra) -> Dict[str, Any]:
+        return {
+            "type": "progress",
+            "job_id": job["id"],
+            "status": job["status"],
+            "expanded": job["expanded"],
+            "frontier": len(job["frontier"]),
+            "nodes": job["node_count"],
+            "links": job["link_count"],
+            "time": time.time(),
+            **extra
+        }
+
+    def _emit(self, job: Dict[str, Any], **extra):
+        with self.lock:
+            self.events.setdefault(job["id"], deque(maxlen=MAX_EVENTS)).append(self._event(job, **extra))
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+        return job if job is not None else self.store.load(job_id)
+
+    def progress(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Summarize a job without its frontier"""
+        with self.lock:
+            return {
+                "job_id": job["id"],
+                "root": job["root"],
+                "direction": job["direction"],
+                "status": job["status"],
+                "expanded": job["expanded"],
+                "frontier": len(job["frontier"]),
+                "nodes": job["node_count"],
+                "links": job["link_count"],
+                "max_nodes": job["max_nodes"],
+                "error": job["error"],
+                "updated_at": job["updated_at"]
+            }
+
+    def events_since(self, job_id: str, since: float) -> List[Dict[str, Any]]:
+        with self.lock:
+            return [event for event in self.events.get(job_id, ()) if event["time"] > since]
+
+    def graph(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """The materialized graph of a finished crawl, or None"""
+        cached = cache.get(f"graph:crawl:{job_id}")
+        if cached is not None:
+            return cached
+        try:
+            with open(self._file(job_id, "graph.json"), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def _iter_jsonl(self, job_id: str, suffix: str) -> Iterator[Dict[str, Any]]:
+        try:
+            with open(self._file(job_id, suffix), 'r', encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        except FileNotFoundError:
+            return
+
+    def iter_nodes(self, job_id: str) -> Iterator[Dict[str, Any]]:
+        """Stream the nodes collected so far straight from the job store"""
+        return self._iter_jsonl(job_id, "nodes.jsonl")
+
+    def iter_links(self, job_id: str) -> Iterator[Dict[str, Any]]:
+        """Stream the links collected so far straight from the job store"""
+        return self._iter_jsonl(job_id, "links.jsonl")
+
+# Global crawl job manager
+crawl_jobs = CrawlJobManager(JobStore(os.path.join(settings.jobs_dir, "crawl")), settings.job_workers)
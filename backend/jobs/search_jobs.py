@@ -0,0 +1,164 @@
+import os
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, Optional
+from backend.api.search import extract_keywords, search_google_scholar, enrich_result
+from backend.config import settings
+from backend.jobs.store import JobStore
+from backend.request_context import request_id_var
+
+logger = logging.getLogger(__name__)
+
+# Query and job states that will not change any more
+FINISHED_STATES = {"completed", "failed"}
+
+class SearchJobManager:
+    """
+    Runs batches of searches on a shared worker pool. Every query of a job is
+    one unit of work; job state is written to disk after each query so that
+    unfinished jobs can be resumed after a restart. All workers share the
+    Semantic Scholar rate limiter, and papers found by several queries of the
+    same job are only enriched and stored once.
+    """
+    def __init__(self, store: JobStore, workers: int):
+        self.store = store
+        self.workers = workers
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        # Per job: normalized Google Scholar title -> enriched paper (or None)
+        self.enriched_titles: Dict[str, Dict[str, Optional[Dict[str, Any]]]] = {}
+        self.lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="search-job")
+        return self._executor
+
+    def submit(self, queries: List[str], max_results: int = 20) -> Dict[str, Any]:
+        """Create a job for the given queries and start working on it"""
+        now = time.time()
+        job = {
+            "id": uuid.uuid4().hex[:12],
+            "status": "queued",
+            "created_at": now,
+            "updated_at": now,
+            "max_results": max_results,
+            "queries": [{"query": query, "status": "pending", "paper_ids": [], "error": None} for query in queries],
+            "papers": {}
+        }
+        with self.lock:
+            self.jobs[job["id"]] = job
+            self.store.save(job)
+        logger.info(f"Submitted search job {job['id']} with {len(queries)} queries")
+        self._schedule(job)
+        return job
+
+    def resume_pending(self):
+        """Reschedule every job that had not finished when the process stopped"""
+        for job in self.store.list():
+            if job["status"] in FINISHED_STATES:
+                continue
+            for entry in job["queries"]:
+                if entry["status"] == "running":
+                    entry["status"] = "pending"
+            with self.lock:
+                self.jobs[job["id"]] = job
+            logger.info(f"Resuming search job {job['id']}")
+            self._schedule(job)
+
+    def _schedule(self, job: Dict[str, Any]):
+        for index, entry in enumerate(job["queries"]):
+            if entry["status"] == "pending":
+                self.executor.submit(self._run_query, job["id"], index)
+
+    def _run_query(self, job_id: str, index: int):
+        # Worker threads log to the job's channel
+        token = request_id_var.set(f"job:{job_id}")
+        try:
+            self._run_query_in_context(job_id, index)
+        finally:
+            request_id_var.reset(token)
+
+    def _run_query_in_context(self, job_id: str, index: int):
+        with self.lock:
+            job = self.jobs[job_id]
+            entry = job["queries"][index]
+            entry["status"] = "running"
+            job["status"] = "running"
+            enriched = self.enriched_titles.setdefault(job_id, {})
+        query = entry["query"]
+        logger.info(f"Search job {job_id}: running query {index + 1}/{len(job['queries'])}: {query}")
+
+        try:
+            english_query = extract_keywords(query)
+            paper_ids = []
+            for result in search_google_scholar(english_query, job["max_results"]):
+                title_key = " ".join((result.get("title") or "").lower().split())
+                with self.lock:
+                    known = title_key in enriched
+                    paper = enriched.get(title_key)
+                if not known:
+                    paper = enrich_result(result)
+                    with self.lock:
+                        enriched[title_key] = paper
+                if paper and paper["id"] not in paper_ids:
+                    paper_ids.append(paper["id"])
+                    with self.lock:
+                        job["papers"].setdefault(paper["id"], paper)
+            with self.lock:
+                entry["paper_ids"] = paper_ids
+                entry["status"] = "completed"
+        except Exception as e:
+            logger.error(f"Search job {job_id}: query {query} failed: {str(e)}")
+            with self.lock:
+                entry["status"] = "failed"
+                entry["error"] = str(e)
+
+        with self.lock:
+            job["updated_at"] = time.time()
+            if all(q["status"] in FINISHED_STATES for q in job["queries"]):
+                job["status"] = "completed"
+                self.enriched_titles.pop(job_id, None)
+                logger.info(f"Search job {job_id} completed with {len(job['papers'])} unique papers")
+            self.store.save(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+        return job if job is not None else self.store.load(job_id)
+
+    def progress(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Summarize a job without its papers"""
+        with self.lock:
+            counts = {}
+            for entry in job["queries"]:
+                counts[entry["status"]] = counts.get(entry["status"], 0) + 1
+            return {
+                "job_id": job["id"],
+                "status": job["status"],
+                "total": len(job["queries"]),
+                "done": counts.get("completed", 0) + counts.get("failed", 0),
+                "queries": counts,
+                "papers": len(job["papers"]),
+                "updated_at": job["updated_at"]
+            }
+
+    def results(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Results grouped by query, with every paper listed once"""
+        with self.lock:
+            return {
+                "job_id": job["id"],
+                "status": job["status"],
+                "queries": [
+                    {"query": entry["query"], "status": entry["status"], "error": entry["error"], "paper_ids": list(entry["paper_ids"])}
+                    for entry in job["queries"]
+                ],
+                "papers": list(job["papers"].values())
+            }
+
+# Global search job manager
+search_jobs = SearchJobManager(JobStore(os.path.join(settings.jobs_dir, "search")), settings.job_workers)
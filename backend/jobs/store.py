@@ -0,0 +1,46 @@
+import json
+import os
+import logging
+from typing import Dict, Any, List, Optional
+
+logger = logging.getLogger(__name__)
+
+class JobStore:
+    """Persists job state as one JSON file per job under a local directory"""
+    def __init__(self, directory: str):
+        self.directory = directory
+
+    def _path(self, job_id: str) -> str:
+        return os.path.join(self.directory, f"{job_id}.json")
+
+    def save(self, job: Dict[str, Any]):
+        """Write the job atomically so a crash never leaves a truncated file"""
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(job["id"])
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Load a job, or None if it does not exist"""
+        try:
+            with open(self._path(job_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Load every job in the directory, skipping unreadable files"""
+        if not os.path.isdir(self.directory):
+            return []
+        jobs = []
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(self.directory, name), 'r', encoding='utf-8') as f:
+                    jobs.append(json.load(f))
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable job file {name}: {str(e)}")
+        return jobs
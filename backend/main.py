@@ -1,21 +1,29 @@
 import logging
-from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse, PlainTextResponse
 # Add the parent directory to the path so we can import backend modules
 import sys
 import os
 import asyncio
 import time
+import itertools
+from contextlib import asynccontextmanager
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from backend.api import search, graph
+from backend.api import search, graph, jobs
 from backend.config import settings
-from backend.websocket_manager import active_connections, broadcast_log
-import uvicorn
+from backend.exporters import iter_graph_export, graph_export_headers, graph_media_type, iter_search_export, SEARCH_MEDIA_TYPES
+from backend.websocket_manager import broadcaster
+from backend.chat_service import process_message, stream_message
+from backend.request_context import request_id_var, new_request_id, bind_context
+from backend.timing import Timings, timings_var
+from backend.metrics import registry, http_request_duration
+from backend import profiling
 import json
+from typing import List
 
 # Configure logging with timestamp format
 logging.basicConfig(
@@ -25,7 +33,28 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Scholar Assistant API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start background services before serving requests and flush them on shutdown"""
+    # WebSocket log delivery (and the Redis backplane, if configured)
+    await broadcaster.start()
+    # Pick up batch jobs that were still running when the server stopped
+    from backend.jobs.search_jobs import search_jobs
+    from backend.jobs.crawl_jobs import crawl_jobs
+    search_jobs.resume_pending()
+    crawl_jobs.resume_pending()
+    if settings.preload_clients:
+        # Build the SDK clients off the event loop so the server accepts
+        # requests right away and the first search does not pay for them
+        asyncio.get_running_loop().run_in_executor(None, search.preload_clients)
+    yield
+    # Give the archive writer a moment to store responses still queued
+    from backend.result_archive import search_archive
+    await asyncio.to_thread(search_archive.flush, 5)
+    from backend.paper_index import paper_index
+    await asyncio.to_thread(paper_index.flush, 5)
+
+app = FastAPI(title="Scholar Assistant API", lifespan=lifespan)
 
 # Configure CORS
 app.add_middleware(
@@ -36,6 +65,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Added before the request id middleware so it runs inside it and sees the id;
+# not installed at all unless profiling is enabled
+if settings.profiling_token:
+    app.middleware("http")(profiling.profiling_middleware)
+    app.include_router(profiling.router)
+
+@app.middleware("http")
+async def request_id_middleware(request: Request, call_next):
+    """Tag everything a request logs with its id (from X-Request-ID or generated)"""
+    request_id = request.headers.get("X-Request-ID") or new_request_id()
+    token = request_id_var.set(request_id)
+    # Collect per-stage timings and report them in a Server-Timing header;
+    # for streamed responses they cover the work done before the body starts
+    timings = Timings()
+    timings_token = timings_var.set(timings)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+        timings_var.reset(timings_token)
+    response.headers["X-Request-ID"] = request_id
+    response.headers["Server-Timing"] = timings.server_timing()
+    return response
+
+@app.middleware("http")
+async def metrics_middleware(request: Request, call_next):
+    """Record the latency of every request by route template"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by the matched route, not the raw path, to keep the label set small
+        route = request.scope.get("route")
+        http_request_duration.observe(
+            time.perf_counter() - started,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=str(status)
+        )
+
 # Mount static files and templates
 # Use absolute paths to avoid directory issues
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -49,23 +121,26 @@ templates = Jinja2Templates(directory=templates_dir)
 # Include API routers
 app.include_router(search.router)
 app.include_router(graph.router)
+app.include_router(jobs.router)
 
 @app.websocket("/ws/logs")
-async def websocket_logs(websocket: WebSocket):
-    """WebSocket endpoint for real-time log streaming"""
+async def websocket_logs(websocket: WebSocket, channel: List[str] = Query(None)):
+    """
+    WebSocket endpoint for real-time log streaming. Clients receive the logs of
+    the channels they subscribe to: a request id (sent as X-Request-ID), "job:<id>"
+    for a batch job, "global" (the default) or "*" for everything. Subscriptions
+    are given as ?channel=... or changed later with {"type": "subscribe"|"unsubscribe", "channel": ...}.
+    """
     await websocket.accept()
-    active_connections.append(websocket)
-    logger.info(f"WebSocket connection established. Total connections: {len(active_connections)}")
+    await broadcaster.register(websocket, channel)
+    logger.info(f"WebSocket connection established. Total connections: {broadcaster.connection_count}")
     
     # Send a test log message to the newly connected client
-    try:
-        await websocket.send_text(json.dumps({
-            "type": "log",
-            "message": "WebSocket connection established successfully",
-            "timestamp": time.strftime('%H:%M:%S', time.localtime())
-        }))
-    except Exception as e:
-        logger.error(f"Error sending test message: {str(e)}")
+    broadcaster.send_to(websocket, {
+        "type": "log",
+        "message": "WebSocket connection established successfully",
+        "timestamp": time.strftime('%H:%M:%S', time.localtime())
+    })
     
     try:
         while True:
@@ -78,30 +153,30 @@ async def websocket_logs(websocket: WebSocket):
                     if message.get("type") == "pong":
                         # Received pong response, connection is alive
                         pass
+                    elif message.get("type") == "subscribe" and message.get("channel"):
+                        broadcaster.subscribe(websocket, str(message["channel"]))
+                    elif message.get("type") == "unsubscribe" and message.get("channel"):
+                        broadcaster.unsubscribe(websocket, str(message["channel"]))
                 except json.JSONDecodeError:
                     # Not a JSON message, ignore
                     pass
             except asyncio.TimeoutError:
                 # Send a ping message to keep the connection alive
-                await websocket.send_text(json.dumps({"type": "ping", "timestamp": int(time.time())}))
+                broadcaster.send_to(websocket, {"type": "ping", "timestamp": int(time.time())})
                 continue
     except WebSocketDisconnect:
-        if websocket in active_connections:
-            active_connections.remove(websocket)
-        logger.info(f"WebSocket connection closed. Total connections: {len(active_connections)}")
+        pass
     except Exception as e:
         logger.error(f"WebSocket error: {str(e)}")
-        if websocket in active_connections:
-            active_connections.remove(websocket)
-        logger.info(f"WebSocket connection closed. Total connections: {len(active_connections)}")
+    await broadcaster.unregister(websocket)
+    logger.info(f"WebSocket connection closed. Total connections: {broadcaster.connection_count}")
 
 # Custom logging handler to broadcast logs
 class WebSocketLogHandler(logging.Handler):
     def emit(self, record):
         log_entry = self.format(record)
-        # Use the queue-based approach for sending logs
-        from backend.websocket_manager import log_and_send
-        log_and_send(log_entry)
+        # Only queues the entry; delivery happens on the broadcaster's tasks
+        broadcaster.publish(log_entry, request_id_var.get())
 
 # Add the custom handler to all relevant loggers
 search_logger = logging.getLogger("backend.api.search")
@@ -110,9 +185,26 @@ search_logger.addHandler(WebSocketLogHandler())
 graph_logger = logging.getLogger("backend.api.graph")
 graph_logger.addHandler(WebSocketLogHandler())
 
+semantic_scholar_logger = logging.getLogger("backend.semantic_scholar")
+semantic_scholar_logger.addHandler(WebSocketLogHandler())
+
+search_jobs_logger = logging.getLogger("backend.jobs.search_jobs")
+search_jobs_logger.addHandler(WebSocketLogHandler())
+
+crawl_jobs_logger = logging.getLogger("backend.jobs.crawl_jobs")
+crawl_jobs_logger.addHandler(WebSocketLogHandler())
+
+chat_logger = logging.getLogger("backend.chat_service")
+chat_logger.addHandler(WebSocketLogHandler())
+
 main_logger = logging.getLogger(__name__)
 main_logger.addHandler(WebSocketLogHandler())
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Metrics of this process in the Prometheus text format"""
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/graph", response_class=HTMLResponse)
 async def graph_page():
     """Serve the graph visualization page"""
@@ -128,49 +220,108 @@ async def root():
 async def chat(message: dict):
     """Handle chat messages from the frontend"""
     logger.info(f"Chat endpoint accessed with message: {message}")
-    # Import the process_message function from frontend
-    import sys
-    import os
-    sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-    from frontend.app import process_message
-    
-    result = process_message(message.get("message", ""))
+    result = await process_message(message.get("message", ""))
     logger.info("Chat message processed successfully")
     return result
 
+@app.post("/api/chat/stream")
+async def chat_stream(message: dict):
+    """Stream the answer to a chat message as newline-delimited JSON events"""
+    logger.info(f"Streaming chat endpoint accessed with message: {message}")
+
+    async def ndjson():
+        async for event in stream_message(message.get("message", "")):
+            yield json.dumps(event, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
+@app.get("/api/export/search")
+async def export_searches(query: List[str] = Query(...), format: str = "csv", max_results: int = 50):
+    """Stream the results of several searches as one CSV or JSONL download"""
+    logger.info(f"Multi-query export endpoint accessed with {len(query)} queries, format: {format}")
+    return stream_search_export(query, format, max_results)
+
 @app.get("/api/export/search/{query}")
-async def export_search(query: str):
-    """Export search results to JSON"""
-    logger.info(f"Export search endpoint accessed with query: {query}")
+async def export_search(query: str, format: str = "json", max_results: int = 50):
+    """Export search results to JSON, or stream them as CSV or JSONL"""
+    logger.info(f"Export search endpoint accessed with query: {query}, format: {format}")
+    if format != "json":
+        return stream_search_export([query], format, max_results)
     try:
         from backend.api.search import search_papers
         # Call the search_papers function directly
-        result = await search_papers(query)
+        result = await search_papers(query, max_results)
         logger.info("Search export completed successfully")
         return result
     except Exception as e:
         logger.error(f"Error exporting search: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error exporting search: {str(e)}")
 
+def stream_search_export(queries: List[str], format: str, max_results: int) -> StreamingResponse:
+    """Build a streaming response that writes each paper as soon as it is enriched"""
+    if format not in SEARCH_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    from backend.api.search import iter_search_results
+
+    def rows():
+        # Papers found by an earlier query are not repeated
+        seen = set()
+        for query in queries:
+            try:
+                for paper in iter_search_results(query, max_results):
+                    if paper["id"] in seen:
+                        continue
+                    seen.add(paper["id"])
+                    yield query, paper
+            except Exception as e:
+                # Headers are already sent, so the best we can do is stop this query
+                logger.error(f"Error exporting search for query {query}: {str(e)}")
+        logger.info(f"Streamed search export of {len(seen)} papers")
+
+    return StreamingResponse(
+        bind_context(iter_search_export(format, rows())),
+        media_type=SEARCH_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="search_results.{format}"'}
+    )
+
 @app.get("/api/export/graph/{paper_id}")
-async def export_graph(paper_id: str):
-    """Export graph data to JSON"""
-    logger.info(f"Export graph endpoint accessed with paper_id: {paper_id}")
+async def export_graph(paper_id: str, format: str = "json"):
+    """Export graph data to JSON, or stream it as GraphML, GEXF, edge-list CSV or JSONL"""
+    logger.info(f"Export graph endpoint accessed with paper_id: {paper_id}, format: {format}")
+    if format != "json" and graph_media_type(format) is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
     try:
-        from backend.api.graph import get_citations, get_references
-        # Call the get_citations and get_references functions directly
-        citations = await get_citations(paper_id)
-        references = await get_references(paper_id)
+        from backend.api.graph import build_citation_graph, build_reference_graph
+        # The route handlers return JSON responses, so build the plain graphs directly
+        citations, references = await asyncio.gather(
+            asyncio.to_thread(profiling.profiled(build_citation_graph), paper_id),
+            asyncio.to_thread(profiling.profiled(build_reference_graph), paper_id)
+        )
         
-        logger.info("Graph export completed successfully")
-        return {
-            "citations": citations,
-            "references": references
-        }
+        if format == "json":
+            logger.info("Graph export completed successfully")
+            return {
+                "citations": citations,
+                "references": references
+            }
+
+        nodes = itertools.chain(
+            [{"id": paper_id, "type": "root"}],
+            citations.get("nodes", []),
+            references.get("nodes", [])
+        )
+        links = itertools.chain(citations.get("links", []), references.get("links", []))
+        logger.info(f"Streaming graph export as {format}")
+        return StreamingResponse(
+            iter_graph_export(format, nodes, links),
+            media_type=graph_media_type(format),
+            headers=graph_export_headers(format, f"graph_{paper_id}")
+        )
     except Exception as e:
         logger.error(f"Error exporting graph: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error exporting graph: {str(e)}")
 
 if __name__ == "__main__":
+    import uvicorn
     logger.info("Starting Scholar Assistant API server")
     uvicorn.run("backend.main:app", host="0.0.0.0", port=8000, reload=True)
@@ -0,0 +1,228 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Default histogram buckets in seconds, from a cache hit to a slow upstream retry
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labelnames: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+class Counter(_Metric):
+    """Monotonically increasing total per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Gauge(_Metric):
+    """
+    Current value per label set. With a function, the value is read from it
+    when the metrics are rendered instead of being set by the code.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        super().__init__(name, help, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self.function = function
+
+    def set(self, value: float, **labels: str):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+    def _samples(self) -> List[str]:
+        if self.function is not None:
+            return [f"{self.name} {_format_value(self.function())}"]
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items]
+
+class Histogram(_Metric):
+    """Bucketed distribution of observed values per label set"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # label set -> [per-bucket counts (not cumulative), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(key, (list(counts), total, count)) for key, (counts, total, count) in self._values.items()]
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+class Registry:
+    """Metrics of this process, rendered in the Prometheus text format"""
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = (),
+              function: Optional[Callable[[], float]] = None) -> Gauge:
+        return self.register(Gauge(name, help, labelnames, function))
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+# Global registry served on /metrics
+registry = Registry()
+
+http_request_duration = registry.histogram(
+    "scholar_http_request_duration_seconds", "Time to produce an HTTP response, by route",
+    ["method", "route", "status"]
+)
+upstream_request_duration = registry.histogram(
+    "scholar_upstream_request_duration_seconds", "Latency of calls to external APIs",
+    ["api", "status"]
+)
+upstream_rate_limited = registry.counter(
+    "scholar_upstream_rate_limited_total", "Responses with status 429 from external APIs", ["api"]
+)
+upstream_retry_sleep = registry.counter(
+    "scholar_upstream_retry_sleep_seconds_total", "Time spent waiting for rate limiter slots and backoff", ["api", "reason"]
+)
+cache_requests = registry.counter(
+    "scholar_cache_requests_total", "Cache lookups by key namespace and result (hit, miss, error)", ["namespace", "result"]
+)
+cache_writes = registry.counter(
+    "scholar_cache_writes_total", "Cache writes by key namespace and result (ok, error)", ["namespace", "result"]
+)
+search_hedges = registry.counter(
+    "scholar_search_hedges_total", "Hedged searches by the source that answered first (serpapi_unhedged: before the hedge delay)", ["first"]
+)
+websocket_dropped = registry.counter(
+    "scholar_websocket_dropped_messages_total", "Log messages dropped before reaching a client", ["reason"]
+)
+
+def cache_namespace(key: str) -> str:
+    """Label for a cache key: its first two segments (e.g. s2:citations), or the first for short keys"""
+    parts = key.split(":")
+    return ":".join(parts[:2]) if len(parts) > 2 else parts[0]
+
+class _UpstreamCall:
+    status = "ok"
+
+@contextmanager
+def upstream_call(api: str) -> Iterator[_UpstreamCall]:
+    """
+    Time one external API call. The caller may set call.status (e.g. to the
+    HTTP status code); an exception records it as "error".
+    """
+    call = _UpstreamCall()
+    started = time.perf_counter()
+    try:
+        yield call
+    except Exception:
+        call.status = "error"
+        raise
+    finally:
+        upstream_request_duration.observe(time.perf_counter() - started, api=api, status=str(call.status))
+        if str(call.status) == "429":
+            upstream_rate_limited.inc(api=api)
@@ -0,0 +1,222 @@
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, Iterable, List, Optional
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = [
+    "CREATE TABLE IF NOT EXISTS papers ("
+    " paper_id TEXT PRIMARY KEY, title TEXT NOT NULL, abstract TEXT, authors TEXT, year INTEGER,"
+    " citation_count INTEGER, url TEXT, updated_at REAL NOT NULL)",
+    # Full-text index over the papers table (external content, kept in sync by the triggers)
+    "CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5("
+    " title, abstract, authors, content='papers', content_rowid='rowid', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN"
+    " INSERT INTO papers_fts (rowid, title, abstract, authors) VALUES (new.rowid, new.title, new.abstract, new.authors);"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN"
+    " INSERT INTO papers_fts (papers_fts, rowid, title, abstract, authors)"
+    " VALUES ('delete', old.rowid, old.title, old.abstract, old.authors);"
+    " END",
+    "CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE ON papers BEGIN"
+    " INSERT INTO papers_fts (papers_fts, rowid, title, abstract, authors)"
+    " VALUES ('delete', old.rowid, old.title, old.abstract, old.authors);"
+    " INSERT INTO papers_fts (rowid, title, abstract, authors) VALUES (new.rowid, new.title, new.abstract, new.authors);"
+    " END",
+]
+
+# Later responses may carry fewer fields (e.g. citation lists without
+# abstracts), so an update never replaces a known value with NULL
+UPSERT = (
+    "INSERT INTO papers (paper_id, title, abstract, authors, year, citation_count, url, updated_at)"
+    " VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+    " ON CONFLICT (paper_id) DO UPDATE SET title = excluded.title,"
+    " abstract = COALESCE(excluded.abstract, abstract), authors = COALESCE(excluded.authors, authors),"
+    " year = COALESCE(excluded.year, year), citation_count = COALESCE(excluded.citation_count, citation_count),"
+    " url = COALESCE(excluded.url, url), updated_at = excluded.updated_at"
+)
+
+# bm25 column weights: a match in the title counts most
+RANK = "bm25(papers_fts, 10.0, 1.0, 2.0)"
+
+def match_expression(query: str) -> Optional[str]:
+    """FTS5 query matching any word of a free-text query; None if it has no words"""
+    words = re.findall(r"\w+", query.lower())
+    if not words:
+        return None
+    # Quoted, so words like AND/NEAR or stray punctuation are not FTS syntax
+    return " OR ".join(f'"{word}"' for word in dict.fromkeys(words))
+
+class PaperIndex:
+    """
+    Local full-text index of every paper seen in Semantic Scholar responses.
+
+    add() only queues the papers; a background thread upserts them into
+    SQLite, whose FTS5 table ranks matches by BM25, so queries can be
+    answered in milliseconds without calling any upstream.
+    """
+    def __init__(self, path: str, queue_size: int = 10000):
+        self.path = path
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._writer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # paper id -> fields last queued, so repeated cache hits are not rewritten
+        self._recent: Dict[str, tuple] = {}
+        self._recent_lock = threading.Lock()
+
+    # Writing
+
+    def add(self, papers: Iterable[Optional[Dict[str, Any]]]):
+        """Queue Semantic Scholar paper objects for indexing; never blocks"""
+        rows = []
+        # Called from every request thread
+        with self._recent_lock:
+            for paper in papers:
+                row = self._row(paper)
+                if row is None or self._recent.get(row[0]) == row[1:7]:
+                    continue
+                self._recent[row[0]] = row[1:7]
+                rows.append(row)
+            if len(self._recent) > 100000:
+                self._recent.clear()
+        if not rows:
+            return
+        self._ensure_writer()
+        try:
+            self.queue.put_nowait(rows)
+        except queue.Full:
+            self.dropped += len(rows)
+            logger.warning(f"Paper index queue full, dropped {len(rows)} papers")
+
+    @staticmethod
+    def _row(paper: Optional[Dict[str, Any]]) -> Optional[tuple]:
+        if not paper or not isinstance(paper, dict) or not paper.get("paperId") or not paper.get("title"):
+            return None
+        authors = paper.get("authors")
+        return (
+            paper["paperId"],
+            paper["title"],
+            paper.get("abstract"),
+            ", ".join(author.get("name", "") for author in authors) if authors else None,
+            paper.get("year"),
+            paper.get("citationCount"),
+            paper.get("url"),
+            time.time(),
+        )
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every queued paper is written; returns False on timeout"""
+        if self._writer is None:
+            return True
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _ensure_writer(self):
+        with self._start_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name="paper-index", daemon=True)
+                self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection for the writer thread, creating the database and schema if needed"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        for statement in SCHEMA:
+            conn.execute(statement)
+        conn.commit()
+        return conn
+
+    def _run(self):
+        conn = self._connect()
+        while True:
+            batches = [self.queue.get()]
+            # Write whatever else is already waiting in the same transaction
+            while len(batches) < 100:
+                try:
+                    batches.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                conn.executemany(UPSERT, [row for rows in batches for row in rows])
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"Error indexing papers: {str(e)}")
+            finally:
+                for _ in batches:
+                    self.queue.task_done()
+
+    # Reading
+
+    def _connect_readonly(self) -> Optional[sqlite3.Connection]:
+        """Read-only connection for queries; None until the writer has created the database"""
+        if not os.path.exists(self.path):
+            return None
+        uri = f"file:{urllib.request.pathname2url(os.path.abspath(self.path))}?mode=ro"
+        return sqlite3.connect(uri, uri=True)
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Best BM25 matches for a free-text query, in the shape of search results"""
+        expression = match_expression(query)
+        conn = self._connect_readonly() if expression is not None else None
+        if conn is None:
+            return []
+        try:
+            rows = conn.execute(
+                f"SELECT p.paper_id, p.title, p.abstract, p.authors, p.year, p.citation_count, p.url, {RANK}"
+                f" FROM papers_fts JOIN papers p ON p.rowid = papers_fts.rowid"
+                f" WHERE papers_fts MATCH ? ORDER BY {RANK} LIMIT ?",
+                (expression, limit)
+            ).fetchall()
+        except sqlite3.OperationalError as e:
+            # The file exists before the writer has created the schema
+            if "no such table" not in str(e):
+                raise
+            return []
+        finally:
+            conn.close()
+        return [{
+            "title": title,
+            "link": url or f"https://www.semanticscholar.org/paper/{paper_id}",
+            "snippet": abstract,
+            "source": "local",
+            "id": paper_id,
+            "cited_by_count": citation_count or 0,
+            "year": year,
+            "authors": authors.split(", ") if authors else [],
+            "abstract": abstract,
+            "paperId": paper_id,
+            # bm25() is lower for better matches
+            "score": round(-rank, 4)
+        } for paper_id, title, abstract, authors, year, citation_count, url, rank in rows]
+
+    def count(self) -> int:
+        conn = self._connect_readonly()
+        if conn is None:
+            return 0
+        try:
+            return conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+        except sqlite3.OperationalError as e:
+            if "no such table" not in str(e):
+                raise
+            return 0
+        finally:
+            conn.close()
+
+# Global index of papers seen in Semantic Scholar responses
+paper_index = PaperIndex(settings.paper_index_path, queue_size=settings.paper_index_queue_size)
@@ -0,0 +1,160 @@
+import contextvars
+import cProfile
+import hmac
+import io
+import logging
+import os
+import pstats
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from fastapi import APIRouter, Header, HTTPException, Request
+from fastapi.responses import FileResponse, PlainTextResponse
+from backend.config import settings
+from backend.request_context import request_id_var
+
+logger = logging.getLogger(__name__)
+
+# Only one profiled request at a time: cProfile cannot run twice on the loop thread
+_profile_lock = threading.Lock()
+
+class RequestProfile:
+    """cProfile runs of one request: the event loop thread plus any worker threads it used"""
+    def __init__(self):
+        self.profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def profile_thread(self) -> Iterator[None]:
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+ allows one active profiler per process, which then
+            # already sees this thread through the request's main profile
+            yield
+            return
+        try:
+            yield
+        finally:
+            profile.disable()
+            with self._lock:
+                self.profiles.append(profile)
+
+    def stats(self) -> pstats.Stats:
+        with self._lock:
+            profiles = list(self.profiles)
+        stats = pstats.Stats(profiles[0])
+        for profile in profiles[1:]:
+            stats.add(profile)
+        return stats
+
+# Profile of the request the current code is working for (None unless profiling)
+profile_var: contextvars.ContextVar[Optional[RequestProfile]] = contextvars.ContextVar("profile", default=None)
+
+def profiled(func: Callable[..., Any]) -> Callable[..., Any]:
+    """
+    Wrap a function about to run on a worker thread so it is included in the
+    current request's profile. Returns func unchanged when not profiling.
+    """
+    session = profile_var.get()
+    if session is None:
+        return func
+
+    def run(*args, **kwargs):
+        with session.profile_thread():
+            return func(*args, **kwargs)
+    return run
+
+def is_admin(token: Optional[str]) -> bool:
+    return bool(settings.profiling_token) and bool(token) and hmac.compare_digest(token, settings.profiling_token)
+
+def profile_path(request_id: str) -> str:
+    # Request ids come from a header, so keep only characters that are safe in a file name
+    safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", request_id)
+    return os.path.join(settings.profiles_dir, f"{safe_id}.prof")
+
+def save_profile(request_id: str, session: RequestProfile) -> str:
+    """Write the merged profile to disk and drop the oldest ones beyond profile_keep"""
+    os.makedirs(settings.profiles_dir, exist_ok=True)
+    path = profile_path(request_id)
+    session.stats().dump_stats(path)
+    stored = sorted(
+        (os.path.join(settings.profiles_dir, name) for name in os.listdir(settings.profiles_dir) if name.endswith(".prof")),
+        key=os.path.getmtime
+    )
+    for old_path in stored[:-settings.profile_keep]:
+        os.remove(old_path)
+    return path
+
+async def profiling_middleware(request: Request, call_next):
+    """
+    Profile a request with cProfile when it asks for it (X-Profile header or
+    profile query flag) and carries the admin token. The profile is stored
+    under the request id. Only installed when PROFILING_TOKEN is set.
+    """
+    wants_profile = request.headers.get("X-Profile") or request.query_params.get("profile")
+    if not wants_profile or not is_admin(request.headers.get("X-Admin-Token")):
+        return await call_next(request)
+    if not _profile_lock.acquire(blocking=False):
+        response = await call_next(request)
+        response.headers["X-Profile-Status"] = "busy"
+        return response
+
+    request_id = request_id_var.get() or "unknown"
+    session = RequestProfile()
+    token = profile_var.set(session)
+    try:
+        # Covers everything that runs on the event loop until the response starts,
+        # including other requests interleaved with this one
+        with session.profile_thread():
+            response = await call_next(request)
+    finally:
+        profile_var.reset(token)
+        _profile_lock.release()
+
+    try:
+        save_profile(request_id, session)
+        logger.info(f"Stored profile for request {request_id}")
+        response.headers["X-Profile-Id"] = request_id
+    except Exception as e:
+        logger.error(f"Error storing profile: {str(e)}")
+        response.headers["X-Profile-Status"] = "error"
+    return response
+
+router = APIRouter(prefix="/admin/profiles", tags=["admin"])
+
+def require_admin(token: Optional[str]):
+    if not is_admin(token):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+@router.get("")
+async def list_profiles(x_admin_token: Optional[str] = Header(None)) -> Dict[str, Any]:
+    """List stored profiles, newest first"""
+    require_admin(x_admin_token)
+    if not os.path.isdir(settings.profiles_dir):
+        return {"profiles": []}
+    names = [name for name in os.listdir(settings.profiles_dir) if name.endswith(".prof")]
+    names.sort(key=lambda name: os.path.getmtime(os.path.join(settings.profiles_dir, name)), reverse=True)
+    return {"profiles": [name[:-len(".prof")] for name in names]}
+
+@router.get("/{request_id}")
+async def get_profile(request_id: str, format: str = "text", sort: str = "cumulative", limit: int = 50,
+                      x_admin_token: Optional[str] = Header(None)):
+    """Return a stored profile as a text summary, or as a .prof file for snakeviz/pstats"""
+    require_admin(x_admin_token)
+    path = profile_path(request_id)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail=f"No profile stored for request {request_id}")
+    if format == "pstats":
+        return FileResponse(path, media_type="application/octet-stream", filename=os.path.basename(path))
+    if format != "text":
+        raise HTTPException(status_code=400, detail=f"Unsupported profile format: {format}")
+
+    output = io.StringIO()
+    try:
+        pstats.Stats(path, stream=output).sort_stats(sort).print_stats(limit)
+    except KeyError:
+        raise HTTPException(status_code=400, detail=f"Unsupported sort key: {sort}")
+    return PlainTextResponse(output.getvalue())
@@ -0,0 +1,62 @@
+import time
+from typing import Any, Dict, Optional
+from backend.config import settings
+from backend.request_context import request_id_var
+from backend.websocket_manager import broadcaster
+
+class ProgressReporter:
+    """
+    Structured progress for one stage of a long-running operation, sent over
+    /ws/logs as {"type": "progress", ...} events on the current request's
+    channel. Updates are rate limited to one per min_interval seconds; the
+    first and the final update of a stage are always sent.
+    """
+    def __init__(self, stage: str, total: Optional[int] = None, min_interval: Optional[float] = None,
+                 channel: Optional[str] = None):
+        self.stage = stage
+        self.total = total
+        self.done = 0
+        self.min_interval = settings.progress_min_interval if min_interval is None else min_interval
+        self.channel = channel or request_id_var.get()
+        self.started = time.monotonic()
+        self.last_sent: Optional[float] = None
+        self.update(0)
+
+    def update(self, done: Optional[int] = None, item: Optional[str] = None, total: Optional[int] = None):
+        """Record progress (absolute done count, or one more item) and maybe send it"""
+        self.done = self.done + 1 if done is None else done
+        if total is not None:
+            self.total = total
+        now = time.monotonic()
+        final = self.total is not None and self.done >= self.total
+        if not final and self.last_sent is not None and now - self.last_sent < self.min_interval:
+            return
+        self._send(now, item)
+
+    def finish(self, item: Optional[str] = None):
+        """Mark the stage as complete"""
+        if self.total is None or self.done < self.total:
+            self.total = self.done
+            self._send(time.monotonic(), item)
+
+    def _send(self, now: float, item: Optional[str]):
+        self.last_sent = now
+        if not broadcaster.has_subscribers(self.channel):
+            return
+        broadcaster.publish_event(self.event(now, item), self.channel)
+
+    def event(self, now: Optional[float] = None, item: Optional[str] = None) -> Dict[str, Any]:
+        elapsed = (now or time.monotonic()) - self.started
+        eta = None
+        if self.total and self.done:
+            eta = round(elapsed / self.done * (self.total - self.done), 2)
+        return {
+            "type": "progress",
+            "stage": self.stage,
+            "done": self.done,
+            "total": self.total,
+            "elapsed": round(elapsed, 2),
+            "eta": eta,
+            "item": item,
+            "timestamp": time.time()
+        }
@@ -0,0 +1,38 @@
+import threading
+import time
+from backend.config import settings
+
+class RateLimiter:
+    """
+    Thread-safe limiter that spaces calls at least 1/rate seconds apart.
+    Every thread shares the same schedule, so a pool of workers together
+    never exceeds the configured rate.
+    """
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self) -> float:
+        """Block until the caller may make a request; returns the seconds waited"""
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def pending(self) -> float:
+        """Seconds until the next free slot, e.g. while a 429 penalty lasts"""
+        with self._lock:
+            return max(self._next_slot - time.monotonic(), 0.0)
+
+    def penalize(self, seconds: float):
+        """Push every caller's next slot back, e.g. after the upstream returned 429"""
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+# Shared limiter for every Semantic Scholar request made by this process
+s2_rate_limiter = RateLimiter(settings.s2_requests_per_second)
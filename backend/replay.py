@@ -0,0 +1,215 @@
+import argparse
+import glob
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+import requests
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+MODES = ("live", "record", "replay")
+
+# Request parameters left out of archive keys, so recordings carry no secrets
+SECRET_PARAMS = {"api_key"}
+
+class ReplayMissError(RuntimeError):
+    """Raised in replay mode for a request that was never recorded"""
+
+def request_key(api: str, request: Dict[str, Any]) -> str:
+    """Stable key of an upstream request, ignoring secrets and the value types of parameters"""
+    params = {name: str(value) for name, value in (request.get("params") or {}).items() if name not in SECRET_PARAMS}
+    canonical = json.dumps({**request, "params": params, "api": api}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+class UpstreamArchive:
+    """
+    SQLite archive of upstream responses. Every response to the same request
+    is kept in order (e.g. a 429 followed by a 200), with its body compressed
+    and the time it took, so replay reproduces both results and latency.
+    """
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT NOT NULL, seq INTEGER NOT NULL, api TEXT NOT NULL, request TEXT NOT NULL,"
+            " status INTEGER NOT NULL, body BLOB NOT NULL, elapsed REAL NOT NULL, recorded_at REAL NOT NULL,"
+            " PRIMARY KEY (key, seq))"
+        )
+        self._conn.commit()
+        # key -> index of the next recording to serve
+        self._cursors: Dict[str, int] = {}
+
+    def record(self, api: str, request: Dict[str, Any], status: int, body: bytes, elapsed: float):
+        key = request_key(api, request)
+        stored_request = {**request, "params": {
+            name: value for name, value in (request.get("params") or {}).items() if name not in SECRET_PARAMS
+        }}
+        with self._lock:
+            seq = self._conn.execute("SELECT COUNT(*) FROM responses WHERE key = ?", (key,)).fetchone()[0]
+            self._conn.execute(
+                "INSERT INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, seq, api, json.dumps(stored_request, ensure_ascii=False), status,
+                 zlib.compress(body), elapsed, time.time())
+            )
+            self._conn.commit()
+
+    def next_response(self, api: str, request: Dict[str, Any]) -> Optional[Tuple[int, bytes, float]]:
+        """
+        The next recorded (status, body, elapsed) for a request, cycling
+        through its recordings in order; None if it was never recorded
+        """
+        key = request_key(api, request)
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM responses WHERE key = ?", (key,)).fetchone()[0]
+            if not count:
+                return None
+            seq = self._cursors.get(key, 0) % count
+            self._cursors[key] = seq + 1
+            status, body, elapsed = self._conn.execute(
+                "SELECT status, body, elapsed FROM responses WHERE key = ? AND seq = ?", (key, seq)
+            ).fetchone()
+        return status, zlib.decompress(body), elapsed
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT api, COUNT(DISTINCT key), COUNT(*), SUM(LENGTH(body)) FROM responses GROUP BY api"
+            ).fetchall()
+        return {api: {"requests": keys, "responses": responses, "compressed_bytes": size}
+                for api, keys, responses, size in rows}
+
+_archive: Optional[UpstreamArchive] = None
+_archive_lock = threading.Lock()
+
+def get_archive() -> UpstreamArchive:
+    """The archive at REPLAY_ARCHIVE, opened on first use"""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = UpstreamArchive(settings.replay_archive)
+        return _archive
+
+def upstream_mode() -> str:
+    if settings.upstream_mode not in MODES:
+        raise ValueError(f"Unknown UPSTREAM_MODE: {settings.upstream_mode}")
+    return settings.upstream_mode
+
+def _replay_delay(elapsed: float):
+    if settings.replay_latency_scale > 0:
+        time.sleep(elapsed * settings.replay_latency_scale)
+
+def recorded_get(api: str, url: str, params: Optional[Dict[str, Any]] = None,
+                 headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None) -> requests.Response:
+    """
+    Drop-in for requests.get that records or replays the response according
+    to UPSTREAM_MODE. The host is not part of the key, so an archive recorded
+    against one base URL replays under another.
+    """
+    mode = upstream_mode()
+    if mode == "live":
+        return requests.get(url, params=params, headers=headers, timeout=timeout)
+
+    request = {"method": "GET", "path": urlsplit(url).path, "params": params or {}}
+    if mode == "replay":
+        recorded = get_archive().next_response(api, request)
+        if recorded is None:
+            raise ReplayMissError(f"No recorded {api} response for GET {request['path']} {request['params']}")
+        status, body, elapsed = recorded
+        _replay_delay(elapsed)
+        response = requests.Response()
+        response.status_code = status
+        response._content = body
+        response.url = url
+        response.headers["Content-Type"] = "application/json"
+        return response
+
+    started = time.perf_counter()
+    response = requests.get(url, params=params, headers=headers, timeout=timeout)
+    get_archive().record(api, request, response.status_code, response.content, time.perf_counter() - started)
+    return response
+
+def recorded_call(api: str, request: Dict[str, Any], call: Callable[[], Any]) -> Any:
+    """
+    Record or replay the JSON-serializable result of an SDK call (SerpAPI,
+    DashScope) identified by request. Failed calls are not recorded.
+    """
+    mode = upstream_mode()
+    if mode == "live":
+        return call()
+
+    if mode == "replay":
+        recorded = get_archive().next_response(api, request)
+        if recorded is None:
+            raise ReplayMissError(f"No recorded {api} response for {request}")
+        _, body, elapsed = recorded
+        _replay_delay(elapsed)
+        return json.loads(body)
+
+    started = time.perf_counter()
+    result = call()
+    get_archive().record(api, request, 200, json.dumps(result, ensure_ascii=False).encode("utf-8"),
+                         time.perf_counter() - started)
+    return result
+
+def serp_request(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Archive request for a Google Scholar search: the parameters that select the results"""
+    return {"method": "search", "params": {name: params.get(name) for name in ("engine", "q", "num")}}
+
+def import_serp_results(directory: str) -> int:
+    """
+    Load the raw SerpAPI responses saved in search_results/*.json into the
+    archive, so searches made before recording existed can be replayed too
+    """
+    archive = get_archive()
+    imported = 0
+    for path in sorted(glob.glob(os.path.join(directory, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            results = json.load(f)
+        params = results.get("search_parameters") or {}
+        if not params.get("q"):
+            continue
+        archive.record("serpapi", serp_request(params), 200, json.dumps(results, ensure_ascii=False).encode("utf-8"), 0.0)
+        imported += 1
+    return imported
+
+def import_serp_archive(limit: int = 100000) -> int:
+    """Load the responses kept by the search archive into the replay archive"""
+    from backend.result_archive import search_archive
+    archive = get_archive()
+    imported = 0
+    for record in search_archive.iter_records(limit=limit):
+        results = record["payload"]
+        params = results.get("search_parameters") or {"engine": "google_scholar", "q": record["query"]}
+        archive.record("serpapi", serp_request(params), 200, json.dumps(results, ensure_ascii=False).encode("utf-8"), 0.0)
+        imported += 1
+    return imported
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or fill the upstream record/replay archive")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("summary", help="Show recorded requests per upstream")
+    import_parser = commands.add_parser("import-serp", help="Import SerpAPI responses from the search archive")
+    import_parser.add_argument("directory", nargs="?", help="Import legacy search_results/*.json files from here instead")
+    args = parser.parse_args()
+
+    if args.command == "import-serp":
+        imported = import_serp_results(args.directory) if args.directory else import_serp_archive()
+        print(f"Imported {imported} SerpAPI responses into {settings.replay_archive}")
+    print(json.dumps(get_archive().summary(), indent=2))
+
+if __name__ == "__main__":
+    main()
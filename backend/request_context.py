@@ -0,0 +1,27 @@
+import contextvars
+import uuid
+from typing import Iterator, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Id of the request (or background job) the current code is working for
+request_id_var: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+
+def new_request_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+def get_request_id() -> Optional[str]:
+    return request_id_var.get()
+
+def bind_context(iterator: Iterator[T]) -> Iterator[T]:
+    """
+    Run every step of a sync iterator inside the caller's context, so request
+    ids survive when a StreamingResponse iterates it on a worker thread.
+    """
+    context = contextvars.copy_context()
+    while True:
+        try:
+            item = context.run(next, iterator)
+        except StopIteration:
+            return
+        yield item
@@ -0,0 +1,97 @@
+import datetime
+import math
+import re
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from backend.config import settings
+
+# BM25 parameters
+K1 = 1.2
+B = 0.75
+
+# Title words count this many times as much as abstract words
+TITLE_WEIGHT = 3
+
+# Queries and documents are split into words the same way, so any
+# punctuation (including non-ASCII, e.g. "，" or "“") separates words
+WORD = re.compile(r"\w+")
+
+def query_terms(query: str) -> List[str]:
+    """Distinct lowercase words of the query"""
+    return list(dict.fromkeys(WORD.findall(query.lower())))
+
+def padded_words(text: Optional[str]) -> Tuple[str, int]:
+    """
+    (the lowercase words of text, every word wrapped in its own spaces so
+    that " word " counts whole-word occurrences; the number of words)
+    """
+    words = WORD.findall(text.lower()) if text else []
+    return " " + "  ".join(words) + " ", len(words)
+
+def term_matrix(query_terms: List[str], papers: List[Dict[str, Any]]):
+    """
+    (term frequencies of the query terms per paper, document lengths in
+    words) as arrays of shape (papers, terms) and (papers,); the title
+    counts TITLE_WEIGHT times
+    """
+    # Only the query terms are counted, with str.count over the joined words,
+    # instead of building a term counter for every abstract
+    needles = [f" {term} " for term in query_terms]
+    title_counts, abstract_counts, lengths = [], [], []
+    for paper in papers:
+        title, title_length = padded_words(paper.get("title"))
+        abstract, abstract_length = padded_words(paper.get("abstract") or paper.get("snippet"))
+        title_counts.append([title.count(needle) for needle in needles])
+        abstract_counts.append([abstract.count(needle) for needle in needles])
+        lengths.append(TITLE_WEIGHT * title_length + abstract_length)
+    shape = (len(papers), len(query_terms))
+    tf = TITLE_WEIGHT * np.array(title_counts, dtype=float).reshape(shape) \
+        + np.array(abstract_counts, dtype=float).reshape(shape)
+    return tf, np.array(lengths, dtype=float)
+
+def bm25_scores(tf: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """BM25 of every paper, with document frequencies taken from the result set itself"""
+    n = tf.shape[0]
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log1p((n - df + 0.5) / (df + 0.5))
+    avg_length = lengths.mean() or 1.0
+    norm = K1 * (1 - B + B * lengths / avg_length)
+    return ((tf * (K1 + 1)) / (tf + norm[:, None]) * idf).sum(axis=1)
+
+def scale(values: np.ndarray) -> np.ndarray:
+    """Values divided by their maximum, so every feature lies in [0, 1]"""
+    top = values.max() if values.size else 0.0
+    return values / top if top > 0 else np.zeros_like(values)
+
+def relevance_scores(query: str, papers: List[Dict[str, Any]], citation_weight: float,
+                     recency_weight: float, half_life: float) -> np.ndarray:
+    """
+    Text relevance (BM25 over titles and abstracts) plus citation_weight
+    times log citation count plus recency_weight times a recency score
+    that halves every half_life years; every feature scaled to [0, 1]
+    """
+    terms = query_terms(query)
+    tf, lengths = term_matrix(terms, papers)
+    text = scale(bm25_scores(tf, lengths)) if terms else np.zeros(len(papers))
+
+    citations = np.array([paper.get("cited_by_count") or 0 for paper in papers], dtype=float)
+    # Papers without a year get no recency credit
+    years = np.array([paper.get("year") or math.nan for paper in papers], dtype=float)
+    age = np.clip(datetime.date.today().year - years, 0, None)
+    recency = np.nan_to_num(np.exp2(-age / half_life))
+    return text + citation_weight * scale(np.log1p(citations)) + recency_weight * recency
+
+def rerank_results(query: str, papers: List[Dict[str, Any]], citation_weight: Optional[float] = None,
+                   recency_weight: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    papers sorted by relevance to query, best first, each with its
+    "relevance" score; ties keep their original order. Weights default to
+    RERANK_CITATION_WEIGHT and RERANK_RECENCY_WEIGHT.
+    """
+    if not papers:
+        return papers
+    citation_weight = settings.rerank_citation_weight if citation_weight is None else citation_weight
+    recency_weight = settings.rerank_recency_weight if recency_weight is None else recency_weight
+    scores = relevance_scores(query, papers, citation_weight, recency_weight, settings.rerank_recency_half_life)
+    order = np.argsort(-scores, kind="stable")
+    return [{**papers[i], "relevance": round(float(scores[i]), 4)} for i in order]
@@ -0,0 +1,228 @@
+import gzip
+import json
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, Iterator, List, Optional
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.sqlite"
+
+# Seconds between retention runs of an otherwise idle writer
+RETENTION_INTERVAL = 3600
+
+class SearchArchive:
+    """
+    Append-only archive of raw search responses.
+
+    submit() only puts the record on a bounded queue; a background thread
+    compresses each record as its own gzip member, appends it to the current
+    segment file and indexes it by query and time in SQLite. Segments roll
+    over at segment_max_bytes or after a day (less for short retention), and
+    whole segments are deleted once they are older than max_age_days or the
+    archive exceeds max_total_bytes; retention runs at every rollover and at
+    least every RETENTION_INTERVAL seconds.
+    """
+    def __init__(self, directory: str, segment_max_bytes: int, max_total_bytes: int,
+                 max_age_days: float, queue_size: int = 1000):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self.max_total_bytes = max_total_bytes
+        self.max_age_seconds = max_age_days * 86400
+        # Quiet archives never fill a segment, so segments also roll over by age
+        self.segment_max_seconds = min(86400, self.max_age_seconds / 2)
+        self.queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self.dropped = 0
+        self._writer: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+
+    # Writing
+
+    def submit(self, query: str, payload: Dict[str, Any]):
+        """Queue a response for archiving; never blocks, drops it when the writer is behind"""
+        self._ensure_writer()
+        try:
+            self.queue.put_nowait({"query": query, "timestamp": time.time(), "payload": payload})
+        except queue.Full:
+            self.dropped += 1
+            logger.warning(f"Search archive queue full, dropped response for: {query}")
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every submitted record is written; returns False on timeout"""
+        if self._writer is None:
+            return True
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self.queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def _ensure_writer(self):
+        with self._start_lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name="search-archive", daemon=True)
+                self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Connection for the writer thread, creating the index and its schema if needed"""
+        os.makedirs(self.directory, exist_ok=True)
+        conn = sqlite3.connect(os.path.join(self.directory, INDEX_FILE))
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS records ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT, query TEXT NOT NULL, timestamp REAL NOT NULL,"
+            " segment TEXT NOT NULL, offset INTEGER NOT NULL, length INTEGER NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS records_query ON records (query, timestamp)")
+        conn.execute("CREATE INDEX IF NOT EXISTS records_timestamp ON records (timestamp)")
+        conn.commit()
+        return conn
+
+    def _run(self):
+        conn = self._connect()
+        segment_name, segment, segment_started = None, None, 0.0
+        self._apply_retention(conn, None)
+        last_retention = time.monotonic()
+        while True:
+            try:
+                records = [self.queue.get(timeout=RETENTION_INTERVAL)]
+            except queue.Empty:
+                records = []
+            # Write whatever else is already waiting in the same transaction
+            while records and len(records) < 100:
+                try:
+                    records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                for record in records:
+                    if (segment is None or segment.tell() >= self.segment_max_bytes
+                            or record["timestamp"] - segment_started >= self.segment_max_seconds):
+                        if segment is not None:
+                            segment.close()
+                            self._apply_retention(conn, None)
+                            last_retention = time.monotonic()
+                        segment_started = record["timestamp"]
+                        segment_name = f"segment-{int(segment_started * 1000)}.jsonl.gz"
+                        segment = open(os.path.join(self.directory, segment_name), "ab")
+                    data = gzip.compress(json.dumps(record, ensure_ascii=False).encode("utf-8"))
+                    offset = segment.tell()
+                    segment.write(data)
+                    conn.execute(
+                        "INSERT INTO records (query, timestamp, segment, offset, length) VALUES (?, ?, ?, ?, ?)",
+                        (record["query"], record["timestamp"], segment_name, offset, len(data))
+                    )
+                if records:
+                    segment.flush()
+                    conn.commit()
+                if time.monotonic() - last_retention >= RETENTION_INTERVAL:
+                    if segment is not None and time.time() - segment_started >= self.segment_max_seconds:
+                        segment.close()
+                        segment = None
+                    self._apply_retention(conn, segment_name if segment is not None else None)
+                    last_retention = time.monotonic()
+            except Exception as e:
+                logger.error(f"Error archiving search results: {str(e)}")
+            finally:
+                for _ in records:
+                    self.queue.task_done()
+
+    def _apply_retention(self, conn: sqlite3.Connection, current: Optional[str]):
+        """Delete the oldest segments beyond the age and size limits, except current (still being written)"""
+        segments = sorted(name for name in os.listdir(self.directory) if name.startswith("segment-"))
+        if not segments:
+            return
+        sizes = {name: os.path.getsize(os.path.join(self.directory, name)) for name in segments}
+        total = sum(sizes.values())
+        cutoff = time.time() - self.max_age_seconds
+        for name in segments:
+            if name == current:
+                break
+            newest = conn.execute("SELECT MAX(timestamp) FROM records WHERE segment = ?", (name,)).fetchone()[0]
+            too_old = newest is None or newest < cutoff
+            if not too_old and total <= self.max_total_bytes:
+                break
+            os.remove(os.path.join(self.directory, name))
+            conn.execute("DELETE FROM records WHERE segment = ?", (name,))
+            total -= sizes[name]
+            logger.info(f"Removed search archive segment {name}")
+        conn.commit()
+
+    # Reading
+
+    def _connect_readonly(self) -> Optional[sqlite3.Connection]:
+        """Read-only connection for queries; None until the writer has created the index"""
+        path = os.path.join(self.directory, INDEX_FILE)
+        if not os.path.exists(path):
+            return None
+        uri = f"file:{urllib.request.pathname2url(os.path.abspath(path))}?mode=ro"
+        return sqlite3.connect(uri, uri=True)
+
+    def find(self, query: Optional[str] = None, since: Optional[float] = None, until: Optional[float] = None,
+             limit: int = 100) -> List[Dict[str, Any]]:
+        """Index entries (id, query, timestamp), newest first, optionally filtered by query and time"""
+        conditions, params = [], []
+        if query is not None:
+            conditions.append("query = ?")
+            params.append(query)
+        if since is not None:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            conditions.append("timestamp < ?")
+            params.append(until)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        conn = self._connect_readonly()
+        if conn is None:
+            return []
+        try:
+            rows = conn.execute(
+                f"SELECT id, query, timestamp FROM records {where} ORDER BY timestamp DESC LIMIT ?",
+                params + [limit]
+            ).fetchall()
+        finally:
+            conn.close()
+        return [{"id": record_id, "query": query, "timestamp": timestamp} for record_id, query, timestamp in rows]
+
+    def read(self, record_id: int) -> Optional[Dict[str, Any]]:
+        """One archived record ({"query", "timestamp", "payload"}), or None if it no longer exists"""
+        conn = self._connect_readonly()
+        if conn is None:
+            return None
+        try:
+            row = conn.execute("SELECT segment, offset, length FROM records WHERE id = ?", (record_id,)).fetchone()
+        finally:
+            conn.close()
+        if row is None:
+            return None
+        segment, offset, length = row
+        try:
+            with open(os.path.join(self.directory, segment), "rb") as f:
+                f.seek(offset)
+                data = f.read(length)
+        except FileNotFoundError:
+            return None
+        return json.loads(gzip.decompress(data))
+
+    def iter_records(self, query: Optional[str] = None, since: Optional[float] = None,
+                     until: Optional[float] = None, limit: int = 100) -> Iterator[Dict[str, Any]]:
+        for entry in self.find(query, since, until, limit):
+            record = self.read(entry["id"])
+            if record is not None:
+                yield {"id": entry["id"], **record}
+
+# Global archive for raw SerpAPI responses
+search_archive = SearchArchive(
+    settings.search_archive_dir,
+    segment_max_bytes=settings.search_archive_segment_mb * 1024 * 1024,
+    max_total_bytes=settings.search_archive_max_mb * 1024 * 1024,
+    max_age_days=settings.search_archive_max_days,
+    queue_size=settings.search_archive_queue_size
+)
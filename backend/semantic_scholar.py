@@ -0,0 +1,199 @@
+import re
+import requests
+import logging
+from typing import Dict, Any, Optional
+from backend.cache.redis_cache import cache
+from backend.config import settings
+from backend.rate_limit import s2_rate_limiter
+from backend.timing import timed, record
+from backend.metrics import upstream_retry_sleep
+from backend.circuit_breaker import breakers, guarded_call, circuit_rejected, CircuitOpenError, UpstreamUnavailable
+from backend.replay import recorded_get
+from backend.deadline import check_deadline
+from backend.paper_index import paper_index
+
+logger = logging.getLogger(__name__)
+
+# Semantic Scholar API configuration
+SEMANTIC_SCHOLAR_API = settings.semantic_scholar_api
+HEADERS = {"User-Agent": "ScholarAssistant/1.0"}
+
+# Fields kept in the local title index
+TITLE_FIELDS = "paperId,title,year,citationCount"
+
+# Identifier patterns, most specific first; each maps a match to an S2 paper id
+_S2_URL = re.compile(r"semanticscholar\.org/paper/(?:[^/\s]+/)?([0-9a-f]{40})\b", re.IGNORECASE)
+_ARXIV_URL = re.compile(r"arxiv\.org/(?:abs|pdf)/([^\s?#]+?)(?:v\d+)?(?:\.pdf)?(?:[?#].*)?$", re.IGNORECASE)
+_DOI = re.compile(r"^(?:(?:https?://)?(?:dx\.)?doi\.org/|doi:\s*)?(10\.\d{4,9}/\S+)$", re.IGNORECASE)
+_ARXIV_ID = re.compile(r"^(?:arxiv:\s*)?(\d{4}\.\d{4,5}|[a-z\-]+(?:\.[a-z]{2})?/\d{7})(?:v\d+)?$", re.IGNORECASE)
+_S2_ID = re.compile(r"^[0-9a-f]{40}$", re.IGNORECASE)
+_CORPUS_ID = re.compile(r"^corpus\s*id:\s*(\d+)$", re.IGNORECASE)
+
+def s2_get(path: str, params: Optional[Dict[str, Any]] = None, max_retries: int = 5) -> Optional[Dict[str, Any]]:
+    """
+    GET a Semantic Scholar endpoint with exponential backoff on rate limiting.
+    Returns the decoded JSON body, or None if every attempt was rate limited
+    or the circuit breaker is refusing calls to Semantic Scholar. Raises
+    DeadlineExceeded instead of (re)trying after the request's deadline.
+    """
+    url = f"{SEMANTIC_SCHOLAR_API}{path}"
+    logger.info(f"Making request to Semantic Scholar API: {url}")
+    breaker = breakers["semantic_scholar"]
+
+    for attempt in range(max_retries):
+        check_deadline()
+        # Give up right away while the circuit is open instead of queueing
+        # behind the shared backoff
+        if breaker.retry_after() > 0:
+            logger.info(f"Semantic Scholar circuit is {breaker.state}, skipping {url}")
+            circuit_rejected.inc(api="semantic_scholar")
+            return None
+        # Wait for a slot shared with every other thread calling Semantic Scholar
+        waited = s2_rate_limiter.acquire()
+        # After a 429 the wait is mostly the backoff penalty
+        record("s2_backoff" if attempt else "s2_wait", waited)
+        if waited > 0:
+            upstream_retry_sleep.inc(waited, api="semantic_scholar", reason="backoff" if attempt else "rate_limit")
+        try:
+            with timed("s2"), guarded_call("semantic_scholar") as call:
+                response = recorded_get("semantic_scholar", url, params=params, headers=HEADERS,
+                                        timeout=settings.upstream_timeout)
+                call.status = response.status_code
+        except CircuitOpenError as e:
+            # Another caller's half-open probe is in flight
+            logger.info(f"Skipping {url}: {str(e)}")
+            return None
+        # Handle rate limiting
+        if response.status_code == 429:
+            wait_time = 5 * (2 ** attempt)  # Exponential backoff: 5, 10, 20, 40, 80 seconds
+            logger.info(f"Rate limit exceeded. Attempt {attempt + 1}/{max_retries}. Waiting for {wait_time} seconds before retry...")
+            # Back off every caller, not just this one
+            s2_rate_limiter.penalize(wait_time)
+            continue
+        break
+    else:
+        logger.info(f"Failed to get {url} after {max_retries} attempts due to rate limiting")
+        return None
+
+    response.raise_for_status()
+    return response.json()
+
+def cached_s2_get(cache_key: str, path: str, params: Optional[Dict[str, Any]] = None, max_retries: int = 5) -> Optional[Dict[str, Any]]:
+    """Like s2_get, but serve from and populate the Redis cache"""
+    cached_result = cache.get(cache_key)
+    if cached_result is not None:
+        logger.info(f"Cache hit for key: {cache_key}")
+        return cached_result
+
+    data = s2_get(path, params, max_retries=max_retries)
+    if data is not None:
+        cache.set(cache_key, data)
+    return data
+
+def s2_unavailable(what: str) -> UpstreamUnavailable:
+    """Error for a Semantic Scholar request that got no answer (s2_get returned None)"""
+    retry_after = max(breakers["semantic_scholar"].retry_after(), s2_rate_limiter.pending())
+    return UpstreamUnavailable("semantic_scholar", retry_after,
+                               f"Semantic Scholar did not return {what} (rate limited or circuit open)")
+
+def fetch_citations(paper_id: str, limit: int = 100, fields: Optional[str] = None, max_retries: int = 5) -> Dict[str, Any]:
+    """
+    Fetch the raw list of papers citing paper_id. Raises UpstreamUnavailable
+    when Semantic Scholar gives no answer, so that is not mistaken for a
+    paper without citations.
+    """
+    params = {"limit": limit}
+    if fields:
+        params["fields"] = fields
+    cache_key = f"s2:citations:{paper_id}:{limit}:{fields or ''}"
+    data = cached_s2_get(cache_key, f"/paper/{paper_id}/citations", params, max_retries=max_retries)
+    if data is None:
+        raise s2_unavailable(f"the citations of {paper_id}")
+    paper_index.add(entry.get("citingPaper") for entry in data.get("data") or [] if isinstance(entry, dict))
+    return data
+
+def fetch_references(paper_id: str, limit: int = 100, fields: Optional[str] = None, max_retries: int = 5) -> Dict[str, Any]:
+    """Fetch the raw list of papers referenced by paper_id; raises UpstreamUnavailable like fetch_citations"""
+    params = {"limit": limit}
+    if fields:
+        params["fields"] = fields
+    cache_key = f"s2:references:{paper_id}:{limit}:{fields or ''}"
+    data = cached_s2_get(cache_key, f"/paper/{paper_id}/references", params, max_retries=max_retries)
+    if data is None:
+        raise s2_unavailable(f"the references of {paper_id}")
+    paper_index.add(entry.get("citedPaper") for entry in data.get("data") or [] if isinstance(entry, dict))
+    return data
+
+def parse_paper_identifier(text: str) -> Optional[str]:
+    """
+    Recognise a DOI, arXiv id, Semantic Scholar id, CorpusId or paper URL and
+    return it in the form the S2 paper endpoints accept. Returns None for
+    anything else, e.g. a free-text title.
+    """
+    text = text.strip()
+    match = _S2_URL.search(text)
+    if match:
+        return match.group(1).lower()
+    match = _ARXIV_URL.search(text)
+    if match:
+        return f"ARXIV:{match.group(1)}"
+    match = _DOI.match(text)
+    if match:
+        return f"DOI:{match.group(1)}"
+    match = _ARXIV_ID.match(text)
+    if match:
+        return f"ARXIV:{match.group(1)}"
+    if _S2_ID.match(text):
+        return text.lower()
+    match = _CORPUS_ID.match(text)
+    if match:
+        return f"CorpusId:{match.group(1)}"
+    return None
+
+def normalize_title(title: str) -> str:
+    """Lowercase a title and reduce it to words, so small formatting differences still match"""
+    return " ".join(re.findall(r"\w+", title.lower()))
+
+def remember_title(paper: Dict[str, Any]):
+    """Add a resolved paper to the local title index and the full-text paper index"""
+    paper_index.add([paper])
+    if paper.get("paperId") and paper.get("title"):
+        cache.set(f"title:{normalize_title(paper['title'])}", {
+            "paperId": paper["paperId"],
+            "title": paper["title"],
+            "year": paper.get("year"),
+            "citationCount": paper.get("citationCount")
+        })
+
+def match_title(title: str) -> Optional[Dict[str, Any]]:
+    """
+    Resolve a title to one paper: first from the local title index, otherwise
+    with a single S2 title-match call. Returns None if nothing matches.
+    """
+    cache_key = f"title:{normalize_title(title)}"
+    indexed = cache.get(cache_key)
+    if indexed is not None:
+        logger.info(f"Title index hit for: {title}")
+        return indexed
+
+    try:
+        data = s2_get("/paper/search/match", {"query": title, "fields": TITLE_FIELDS})
+    except requests.HTTPError as e:
+        # The match endpoint answers 404 when no title is close enough
+        if e.response is not None and e.response.status_code == 404:
+            logger.info(f"No title match for: {title}")
+            return None
+        raise
+    if not data or not data.get("data"):
+        return None
+    paper = data["data"][0]
+    remember_title(paper)
+    # Also index the query itself, which may differ from the canonical title
+    cache.set(cache_key, paper)
+    return paper
+
+def fetch_paper(paper_id: str, fields: str = TITLE_FIELDS, max_retries: int = 5) -> Optional[Dict[str, Any]]:
+    """Fetch one paper's details by any id the S2 paper endpoint accepts"""
+    paper = cached_s2_get(f"s2:paper:{paper_id}:{fields}", f"/paper/{paper_id}", {"fields": fields}, max_retries=max_retries)
+    paper_index.add([paper])
+    return paper
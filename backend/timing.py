@@ -0,0 +1,81 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+class Timings:
+    """
+    Total time and call count per stage for one request. Stages may nest
+    (e.g. "enrich" includes the "s2" calls it makes), so they do not add up
+    to the request total. Safe to update from worker threads.
+    """
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._lock = threading.Lock()
+        self._stages: Dict[str, list] = {}
+
+    def add(self, stage: str, seconds: float):
+        with self._lock:
+            entry = self._stages.setdefault(stage, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    def as_dict(self) -> Dict[str, Dict[str, float]]:
+        """Stage totals in milliseconds, plus the time elapsed so far"""
+        with self._lock:
+            stages = {
+                stage: {"ms": round(total * 1000, 1), "count": count}
+                for stage, (total, count) in self._stages.items()
+            }
+        stages["total"] = {"ms": round((time.perf_counter() - self.started) * 1000, 1), "count": 1}
+        return stages
+
+    def server_timing(self) -> str:
+        """Format the totals as a Server-Timing header value"""
+        return ", ".join(
+            f'{stage};dur={entry["ms"]};desc="{entry["count"]}x"'
+            for stage, entry in self.as_dict().items()
+        )
+
+# Timings of the request the current code is working for (None outside requests)
+timings_var: contextvars.ContextVar[Optional[Timings]] = contextvars.ContextVar("timings", default=None)
+
+def current_timings() -> Optional[Timings]:
+    return timings_var.get()
+
+def record(stage: str, seconds: float):
+    """Add time spent outside a timed() block, e.g. a sleep measured elsewhere"""
+    timings = timings_var.get()
+    if timings is not None:
+        timings.add(stage, seconds)
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """Time the enclosed block as one call of stage; a no-op outside requests"""
+    timings = timings_var.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(stage, time.perf_counter() - started)
+
+def debug_info() -> Dict[str, Dict[str, Dict[str, float]]]:
+    """Timings so far, for the optional debug field of JSON responses"""
+    timings = timings_var.get()
+    return {"timings": timings.as_dict() if timings else {}}
+
+def json_response(payload: Dict[str, Any], debug: bool = False) -> JSONResponse:
+    """
+    Serialize an endpoint's payload inside a "serialize" stage, adding the
+    timings collected so far as a "debug" field when asked to
+    """
+    if debug:
+        payload = {**payload, "debug": debug_info()}
+    with timed("serialize"):
+        return JSONResponse(content=jsonable_encoder(payload))
@@ -2,52 +2,354 @@ import asyncio
 import json
 import logging
 import time
-from typing import List
+from typing import Dict, Iterable, Optional, Set
+from backend.config import settings
+from backend.metrics import registry, websocket_dropped
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-# Store active WebSocket connections
-active_connections: List = []
-
-async def broadcast_log(message: str):
-    """Broadcast log message to all active WebSocket connections"""
-    timestamp = time.strftime('%H:%M:%S', time.localtime())
-    # Create a copy of active_connections to avoid modification during iteration
-    connections = active_connections.copy()
-    disconnected_connections = []
-    
-    for connection in connections:
+# What to do when a client's send queue is full
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "coalesce")
+
+# Channel for messages logged outside of any request
+GLOBAL_CHANNEL = "global"
+# Subscribing to this channel receives every message
+ALL_CHANNELS = "*"
+
+class ClientConnection:
+    """
+    One WebSocket client with a bounded send queue and a single writer task.
+    Only the writer task ever sends on the socket, so a slow client only
+    delays itself.
+    """
+    def __init__(self, websocket, queue_size: int, overflow_policy: str):
+        self.websocket = websocket
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.overflow_policy = overflow_policy
+        self.dropped = 0
+        self.channels: Set[str] = set()
+        self.writer: Optional[asyncio.Task] = None
+
+    def offer(self, frame: str, count: int = 1):
+        """
+        Queue a frame carrying count messages without waiting, applying the
+        overflow policy when the queue is full
+        """
+        if not self.queue.full():
+            self.queue.put_nowait((frame, count))
+            return
+        dropped_before = self.dropped
+        if self.overflow_policy == "drop_newest":
+            self.dropped += count
+        elif self.overflow_policy == "coalesce":
+            # Collapse the whole backlog into the drop notice sent before the next frame
+            while not self.queue.empty():
+                self.dropped += self.queue.get_nowait()[1]
+            self.queue.put_nowait((frame, count))
+        else:
+            self.dropped += self.queue.get_nowait()[1]
+            self.queue.put_nowait((frame, count))
+        websocket_dropped.inc(self.dropped - dropped_before, reason="client_queue_full")
+
+    async def run(self, on_error):
+        """Writer loop: send queued frames in order until the socket fails"""
         try:
-            await connection.send_text(json.dumps({
-                "type": "log",
-                "message": message,
-                "timestamp": timestamp
-            }))
+            while True:
+                frame, _ = await self.queue.get()
+                if self.dropped:
+                    notice = json.dumps({
+                        "type": "log",
+                        "message": f"{self.dropped} log messages were skipped because this client fell behind",
+                        "timestamp": time.strftime('%H:%M:%S', time.localtime())
+                    })
+                    self.dropped = 0
+                    await self.websocket.send_text(notice)
+                await self.websocket.send_text(frame)
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
             logger.error(f"Error broadcasting log: {str(e)}")
-            # Mark connection for removal
-            disconnected_connections.append(connection)
-    
-    # Remove disconnected connections
-    for connection in disconnected_connections:
-        if connection in active_connections:
-            active_connections.remove(connection)
-
-def log_and_send(message: str):
-    """Log a message and send it to all active WebSocket connections"""
-    # Log the message
-    logger.info(message)
-    
-    # Broadcast the message immediately using asyncio
-    try:
-        # Try to get the running event loop
+            await on_error(self.websocket)
+
+class RedisBackplane:
+    """
+    Relays message batches between server processes over Redis pub/sub, so a
+    client receives messages logged by any worker, not just the one it is
+    connected to.
+    """
+    def __init__(self, host: str, port: int, db: int, channel: str):
+        import redis.asyncio
+        self.redis = redis.asyncio.Redis(host=host, port=port, db=db)
+        self.channel = channel
+
+    async def publish(self, batch: list):
+        await self.redis.publish(self.channel, json.dumps(batch))
+
+    async def listen(self, deliver):
+        """
+        Hand every batch published by any worker to deliver(), reconnecting on
+        errors; an outage is logged once, not on every reconnection attempt
+        """
+        failing = False
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                if failing:
+                    logger.info("WebSocket backplane subscription restored")
+                    failing = False
+                async for message in pubsub.listen():
+                    if message["type"] != "message":
+                        continue
+                    deliver([(event, channel) for event, channel in json.loads(message["data"])])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                if not failing:
+                    logger.error(f"WebSocket backplane error, reconnecting until it is back: {str(e)}")
+                    failing = True
+                await asyncio.sleep(1)
+            finally:
+                await self._close(pubsub)
+
+    @staticmethod
+    async def _close(pubsub):
         try:
-            loop = asyncio.get_running_loop()
-            # Schedule the broadcast to run soon
-            loop.create_task(broadcast_log(message))
+            # aclose() is redis>=5; older clients only have reset()
+            close = getattr(pubsub, "aclose", None) or pubsub.reset
+            await close()
+        except Exception as e:
+            logger.debug(f"Error closing WebSocket backplane subscription: {str(e)}")
+
+class LogBroadcaster:
+    """
+    Fans log messages out to the WebSocket clients subscribed to their channel.
+
+    Every message belongs to a channel: the id of the request that logged it,
+    or GLOBAL_CHANNEL. publish() only appends to one bounded queue, so its
+    cost on the request path does not depend on the number of clients and it
+    is safe to call from any thread. A single fan-out task collects messages
+    for up to batch_window seconds (or batch_max messages), serializes each
+    message once, and sends every client one JSON array frame holding the
+    messages of its channels.
+
+    With a backplane, batches go through Redis instead and every process
+    delivers them to its own sockets, including the one that produced them.
+    """
+    def __init__(self, queue_size: int, overflow_policy: str, max_pending: int,
+                 batch_window: float = 0.0, batch_max: int = 1,
+                 backplane: Optional[RedisBackplane] = None):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown WebSocket overflow policy: {overflow_policy}")
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.max_pending = max_pending
+        self.batch_window = batch_window
+        self.batch_max = max(batch_max, 1)
+        self.clients: Dict[object, ClientConnection] = {}
+        self.subscribers: Dict[str, Set[ClientConnection]] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.pending: Optional[asyncio.Queue] = None
+        self.fanout_task: Optional[asyncio.Task] = None
+        self.backplane = backplane
+        self.listen_task: Optional[asyncio.Task] = None
+        # Set while publishing to the backplane fails, so an outage is logged once
+        self.backplane_failing = False
+        self.dropped_pending = 0
+
+    @property
+    def connection_count(self) -> int:
+        return len(self.clients)
+
+    @property
+    def pending_count(self) -> int:
+        """Messages waiting for the fan-out task"""
+        return self.pending.qsize() if self.pending is not None else 0
+
+    @property
+    def queued_frame_count(self) -> int:
+        """Frames waiting in the send queues of all clients"""
+        return sum(client.queue.qsize() for client in list(self.clients.values()))
+
+    async def _ensure_started(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is loop and self.fanout_task is not None and not self.fanout_task.done():
+            return
+        stale = [task for task in (self.fanout_task, self.listen_task) if task is not None and not task.done()]
+        # Replace the tasks before awaiting anything, so concurrent callers do not start them twice
+        self.loop = loop
+        self.pending = asyncio.Queue(maxsize=self.max_pending)
+        self.fanout_task = loop.create_task(self._fanout())
+        self.listen_task = loop.create_task(self.backplane.listen(self._deliver)) if self.backplane else None
+        # A leftover listener would deliver every message a second time
+        for task in stale:
+            task_loop = task.get_loop()
+            if task_loop is loop:
+                task.cancel()
+            elif not task_loop.is_closed():
+                task_loop.call_soon_threadsafe(task.cancel)
+        await asyncio.gather(*[task for task in stale if task.get_loop() is loop], return_exceptions=True)
+
+    async def start(self):
+        """
+        Start the fan-out (and backplane listener) on the running loop. With a
+        backplane this must happen at startup, because a worker without local
+        clients still has to forward the messages its requests log.
+        """
+        await self._ensure_started()
+
+    async def register(self, websocket, channels: Optional[Iterable[str]] = None) -> ClientConnection:
+        """Start delivering messages on the given channels (default: global) to an accepted WebSocket"""
+        await self._ensure_started()
+        client = ClientConnection(websocket, self.queue_size, self.overflow_policy)
+        client.writer = asyncio.get_running_loop().create_task(client.run(self.unregister))
+        self.clients[websocket] = client
+        for channel in channels or [GLOBAL_CHANNEL]:
+            self.subscribe(websocket, channel)
+        return client
+
+    async def unregister(self, websocket):
+        """Stop delivering messages to a WebSocket and cancel its writer"""
+        client = self.clients.pop(websocket, None)
+        if not client:
+            return
+        for channel in list(client.channels):
+            self.unsubscribe(websocket, channel)
+        if client.writer and client.writer is not asyncio.current_task():
+            client.writer.cancel()
+
+    def subscribe(self, websocket, channel: str):
+        client = self.clients.get(websocket)
+        if client:
+            client.channels.add(channel)
+            self.subscribers.setdefault(channel, set()).add(client)
+
+    def unsubscribe(self, websocket, channel: str):
+        client = self.clients.get(websocket)
+        if client:
+            client.channels.discard(channel)
+            subscribers = self.subscribers.get(channel)
+            if subscribers is not None:
+                subscribers.discard(client)
+                if not subscribers:
+                    del self.subscribers[channel]
+
+    def send_to(self, websocket, message: dict):
+        """Queue a message for one client only (e.g. a ping)"""
+        client = self.clients.get(websocket)
+        if client:
+            client.offer(json.dumps(message))
+
+    def has_subscribers(self, channel: Optional[str] = None) -> bool:
+        if self.backplane:
+            # Subscribers may be connected to another worker
+            return True
+        return (channel or GLOBAL_CHANNEL) in self.subscribers or ALL_CHANNELS in self.subscribers
+
+    def publish(self, message: str, channel: Optional[str] = None):
+        """Queue a log message for a channel's subscribers; never blocks, callable from any thread"""
+        if self.has_subscribers(channel):
+            self.publish_event({
+                "type": "log",
+                "message": message,
+                "timestamp": time.strftime('%H:%M:%S', time.localtime())
+            }, channel)
+
+    def publish_event(self, event: dict, channel: Optional[str] = None):
+        """Queue any JSON-serializable event (with a "type") for a channel's subscribers"""
+        channel = channel or GLOBAL_CHANNEL
+        if self.loop is None or self.loop.is_closed():
+            return
+        if not self.has_subscribers(channel):
+            return
+        try:
+            running_loop = asyncio.get_running_loop()
         except RuntimeError:
-            # No event loop running, run the broadcast directly
-            asyncio.run(broadcast_log(message))
-    except Exception as e:
-        logger.error(f"Error broadcasting message: {str(e)}")
+            running_loop = None
+        if running_loop is self.loop:
+            self._enqueue(event, channel)
+            return
+        try:
+            self.loop.call_soon_threadsafe(self._enqueue, event, channel)
+        except RuntimeError:
+            # The loop is shutting down
+            pass
+
+    def _enqueue(self, event: dict, channel: str):
+        if self.pending.full():
+            self.dropped_pending += 1
+            websocket_dropped.inc(reason="pending_queue_full")
+            return
+        self.pending.put_nowait((event, channel))
+
+    async def _fanout(self):
+        while True:
+            batch = [await self.pending.get()]
+            # Give the window time to fill unless a full batch is already waiting
+            if self.batch_window > 0 and self.pending.qsize() < self.batch_max - 1:
+                await asyncio.sleep(self.batch_window)
+            while len(batch) < self.batch_max and not self.pending.empty():
+                batch.append(self.pending.get_nowait())
+            if self.backplane:
+                try:
+                    await self.backplane.publish(batch)
+                    if self.backplane_failing:
+                        logger.info("Publishing to WebSocket backplane again")
+                        self.backplane_failing = False
+                    continue
+                except Exception as e:
+                    # Fall back to local delivery so this worker's clients still get logs
+                    if not self.backplane_failing:
+                        logger.error(f"Error publishing to WebSocket backplane, delivering locally until it is back: {str(e)}")
+                        self.backplane_failing = True
+            self._deliver(batch)
+
+    def _deliver(self, batch):
+        """Send every client one array frame with the batch messages it subscribed to"""
+        everything = self.subscribers.get(ALL_CHANNELS, set())
+        per_client: Dict[ClientConnection, list] = {}
+        for event, channel in batch:
+            subscribers = self.subscribers.get(channel, set())
+            if not subscribers and not everything:
+                continue
+            encoded = json.dumps({**event, "channel": channel})
+            for client in subscribers:
+                per_client.setdefault(client, []).append(encoded)
+            for client in everything:
+                if channel not in client.channels:
+                    per_client.setdefault(client, []).append(encoded)
+        for client, messages in per_client.items():
+            client.offer("[" + ",".join(messages) + "]", len(messages))
+
+# Global broadcaster for the /ws/logs endpoint
+broadcaster = LogBroadcaster(
+    settings.ws_queue_size,
+    settings.ws_overflow_policy,
+    settings.ws_max_pending,
+    batch_window=settings.ws_batch_window_ms / 1000,
+    batch_max=settings.ws_batch_max,
+    backplane=RedisBackplane(
+        settings.redis_host,
+        settings.redis_port,
+        settings.redis_db,
+        settings.ws_backplane_channel
+    ) if settings.ws_backplane == "redis" else None
+)
+
+registry.gauge("scholar_websocket_connections", "Open /ws/logs connections",
+               function=lambda: broadcaster.connection_count)
+registry.gauge("scholar_websocket_pending_messages", "Log messages waiting to be batched",
+               function=lambda: broadcaster.pending_count)
+registry.gauge("scholar_websocket_queued_frames", "Frames waiting in client send queues",
+               function=lambda: broadcaster.queued_frame_count)
+
+async def broadcast_log(message: str, channel: Optional[str] = None):
+    """Broadcast log message to the WebSocket connections subscribed to its channel"""
+    broadcaster.publish(message, channel)
+
+def log_and_send(message: str, channel: Optional[str] = None):
+    """Log a message and send it to the WebSocket connections subscribed to its channel"""
+    # Log the message
+    logger.info(message)
+    broadcaster.publish(message, channel)
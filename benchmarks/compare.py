@@ -0,0 +1,58 @@
+"""
+Compare two benchmark result files, e.g. from two commits.
+
+    python benchmarks/compare.py baseline.json candidate.json --max-regression 0.10
+
+Exits with status 1 when a scenario's p95 latency grew, or its throughput
+dropped, by more than --max-regression.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, Optional
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "req_per_s", "errors")
+
+def change(before: Optional[float], after: Optional[float]) -> Optional[float]:
+    if before in (None, 0) or after is None:
+        return None
+    return (after - before) / before
+
+def compare(baseline: Dict[str, Any], candidate: Dict[str, Any], max_regression: float) -> bool:
+    """Print a table of both runs; returns False if any scenario regressed"""
+    ok = True
+    print(f"baseline:  {baseline.get('commit', '?')[:12]}  candidate: {candidate.get('commit', '?')[:12]}")
+    print(f"{'scenario':<12}{'metric':<11}{'baseline':>12}{'candidate':>12}{'change':>10}")
+    for scenario, before in baseline.get("scenarios", {}).items():
+        after = candidate.get("scenarios", {}).get(scenario)
+        if after is None:
+            print(f"{scenario:<12}missing from candidate")
+            continue
+        for metric in METRICS:
+            delta = change(before.get(metric), after.get(metric))
+            flag = ""
+            if delta is not None and (
+                (metric == "p95_ms" and delta > max_regression) or
+                (metric == "req_per_s" and -delta > max_regression)
+            ):
+                flag = "  REGRESSION"
+                ok = False
+            delta_text = f"{delta:+.1%}" if delta is not None else "-"
+            print(f"{scenario:<12}{metric:<11}{str(before.get(metric)):>12}{str(after.get(metric)):>12}{delta_text:>10}{flag}")
+    return ok
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--max-regression", type=float, default=0.10,
+                        help="Allowed relative p95 increase / throughput decrease (default: 0.10)")
+    args = parser.parse_args()
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+    sys.exit(0 if compare(baseline, candidate, args.max_regression) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Import-time check for the backend: measures how long `import backend.main`
+takes in fresh interpreters and fails when it regresses or when a heavy SDK
+is imported eagerly again.
+
+    python benchmarks/import_time.py --output import.json
+    python benchmarks/import_time.py --baseline import.json --tolerance 0.25
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+
+# SDKs that must only be imported on first use
+LAZY_MODULES = ("openai", "serpapi", "redis", "gradio", "uvicorn", "numpy")
+
+PROBE = (
+    "import json, sys, time\n"
+    "started = time.perf_counter()\n"
+    "import {module}\n"
+    "elapsed = time.perf_counter() - started\n"
+    "print(json.dumps({{'seconds': elapsed, 'modules': sorted(sys.modules)}}))\n"
+)
+
+def probe(module: str) -> Dict[str, Any]:
+    """Import module in a fresh interpreter and return its time and loaded modules"""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    output = subprocess.check_output(
+        [sys.executable, "-c", PROBE.format(module=module)], cwd=REPO_ROOT, env=env, text=True
+    )
+    return json.loads(output.strip().splitlines()[-1])
+
+def slowest_imports(module: str, top: int) -> List[Dict[str, Any]]:
+    """Packages by the time spent importing their own modules, from -X importtime"""
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPO_ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    packages: Dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+)\s+\|\s+\d+\s+\|\s*(\S+)", line)
+        if not match:
+            continue
+        name = match.group(2).split(".")[0]
+        packages[name] = packages.get(name, 0) + int(match.group(1))
+    ranked = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:top]
+    return [{"package": name, "ms": round(us / 1000, 1)} for name, us in ranked]
+
+def measure(module: str, runs: int, top: int) -> Dict[str, Any]:
+    samples = [probe(module) for _ in range(runs)]
+    seconds = sorted(sample["seconds"] for sample in samples)
+    loaded = set(samples[-1]["modules"])
+    return {
+        "module": module,
+        "runs": runs,
+        "median_ms": round(statistics.median(seconds) * 1000, 1),
+        "min_ms": round(seconds[0] * 1000, 1),
+        "max_ms": round(seconds[-1] * 1000, 1),
+        "eager_sdks": [name for name in LAZY_MODULES if name in loaded],
+        "slowest": slowest_imports(module, top),
+    }
+
+def check(results: Dict[str, Any], max_ms: Optional[float], baseline: Optional[Dict[str, Any]],
+          tolerance: float) -> List[str]:
+    """Reasons the measurement fails, empty when it passes"""
+    failures = []
+    if results["eager_sdks"]:
+        failures.append(f"imported at startup: {', '.join(results['eager_sdks'])}")
+    if max_ms is not None and results["median_ms"] > max_ms:
+        failures.append(f"median {results['median_ms']} ms exceeds --max-ms {max_ms}")
+    if baseline is not None:
+        limit = baseline["median_ms"] * (1 + tolerance)
+        if results["median_ms"] > limit:
+            failures.append(
+                f"median {results['median_ms']} ms is over baseline {baseline['median_ms']} ms +{tolerance:.0%}"
+            )
+    return failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure and check the backend import time")
+    parser.add_argument("--module", default="backend.main")
+    parser.add_argument("--runs", type=int, default=7, help="Fresh interpreters to time")
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to report")
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail when the median exceeds this")
+    parser.add_argument("--baseline", help="Results of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown over the baseline")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    results = measure(args.module, args.runs, args.top)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    failures = check(results, args.max_ms, baseline, args.tolerance)
+    results["failures"] = failures
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
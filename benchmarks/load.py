@@ -0,0 +1,206 @@
+"""
+Load driver for a running backend. Sends each scenario's requests at a
+fixed concurrency and reports latency percentiles and throughput as JSON.
+
+    python benchmarks/load.py --base-url http://127.0.0.1:8000 --concurrency 8 --requests 200
+"""
+import argparse
+import asyncio
+import json
+import math
+import sys
+import time
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+import aiohttp
+
+SCENARIOS = ("search", "search_hedged", "citations", "references", "chat", "ws_logs")
+
+# Fixed root papers so runs against the stubs are comparable
+PAPER_IDS = [f"{i:040x}" for i in range(1, 33)]
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(math.ceil(fraction * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+def summarize(latencies: List[float], statuses: Counter, errors: int, duration: float) -> Dict[str, Any]:
+    values = sorted(latencies)
+    to_ms = lambda value: round(value * 1000, 2) if value is not None else None
+    completed = len(values)
+    return {
+        "requests": completed + errors,
+        "errors": errors,
+        "status_counts": {str(status): count for status, count in sorted(statuses.items(), key=lambda item: str(item[0]))},
+        "duration_s": round(duration, 3),
+        "req_per_s": round(completed / duration, 2) if duration > 0 else None,
+        "mean_ms": to_ms(sum(values) / completed) if completed else None,
+        "p50_ms": to_ms(percentile(values, 0.50)),
+        "p95_ms": to_ms(percentile(values, 0.95)),
+        "p99_ms": to_ms(percentile(values, 0.99)),
+        "max_ms": to_ms(values[-1]) if values else None,
+    }
+
+def make_request(scenario: str, session: aiohttp.ClientSession, base_url: str, max_results: int) -> Callable[[int], Awaitable[int]]:
+    """Return a function performing request number i of a scenario and returning its status"""
+    async def read(response: aiohttp.ClientResponse) -> int:
+        await response.read()
+        return response.status
+
+    async def search(i: int) -> int:
+        params = {"query": f"benchmark query {i % 64}", "max_results": max_results}
+        async with session.get(f"{base_url}/search/papers", params=params) as response:
+            return await read(response)
+
+    async def search_hedged(i: int) -> int:
+        params = {"query": f"benchmark query {i % 64}", "max_results": max_results, "mode": "hedged"}
+        async with session.get(f"{base_url}/search/papers", params=params) as response:
+            return await read(response)
+
+    async def citations(i: int) -> int:
+        async with session.get(f"{base_url}/graph/citations/{PAPER_IDS[i % len(PAPER_IDS)]}") as response:
+            return await read(response)
+
+    async def references(i: int) -> int:
+        async with session.get(f"{base_url}/graph/references/{PAPER_IDS[i % len(PAPER_IDS)]}") as response:
+            return await read(response)
+
+    async def chat(i: int) -> int:
+        message = f"search benchmark topic {i % 64}" if i % 2 == 0 else f"graph {PAPER_IDS[i % len(PAPER_IDS)]}"
+        async with session.post(f"{base_url}/api/chat", json={"message": message}) as response:
+            return await read(response)
+
+    async def ws_logs(i: int) -> int:
+        # Handshake until the welcome message arrives
+        async with session.ws_connect(f"{base_url}/ws/logs") as ws:
+            message = await ws.receive()
+            return 101 if message.type == aiohttp.WSMsgType.TEXT else 0
+
+    return {
+        "search": search,
+        "search_hedged": search_hedged,
+        "citations": citations,
+        "references": references,
+        "chat": chat,
+        "ws_logs": ws_logs,
+    }[scenario]
+
+async def run_scenario(scenario: str, session: aiohttp.ClientSession, base_url: str, concurrency: int,
+                       requests: int, duration: Optional[float], max_results: int) -> Dict[str, Any]:
+    """Run one scenario with concurrency workers until requests are sent or duration elapses"""
+    request = make_request(scenario, session, base_url, max_results)
+    latencies: List[float] = []
+    statuses: Counter = Counter()
+    errors = 0
+    counter = iter(range(sys.maxsize))
+    started = time.perf_counter()
+    deadline = started + duration if duration else None
+
+    async def worker():
+        nonlocal errors
+        while True:
+            i = next(counter)
+            if deadline is None and i >= requests:
+                return
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            request_started = time.perf_counter()
+            try:
+                status = await request(i)
+            except Exception as e:
+                errors += 1
+                statuses[type(e).__name__] += 1
+                continue
+            statuses[status] += 1
+            if 200 <= status < 300 or status == 101:
+                latencies.append(time.perf_counter() - request_started)
+            else:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, statuses, errors, time.perf_counter() - started)
+
+async def count_log_messages(session: aiohttp.ClientSession, base_url: str, stop: asyncio.Event) -> Dict[str, int]:
+    """Listen on every log channel while the benchmark runs"""
+    counts = {"frames": 0, "messages": 0}
+    try:
+        async with session.ws_connect(f"{base_url}/ws/logs", params={"channel": "*"}) as ws:
+            while not stop.is_set():
+                try:
+                    message = await asyncio.wait_for(ws.receive(), timeout=0.5)
+                except asyncio.TimeoutError:
+                    continue
+                if message.type != aiohttp.WSMsgType.TEXT:
+                    break
+                data = json.loads(message.data)
+                counts["frames"] += 1
+                counts["messages"] += len(data) if isinstance(data, list) else 1
+    except Exception:
+        pass
+    return counts
+
+async def run_benchmark(base_url: str, scenarios: List[str], concurrency: int, requests: int,
+                        duration: Optional[float] = None, warmup: int = 0, max_results: int = 10,
+                        timeout: float = 120.0) -> Dict[str, Any]:
+    """Run the scenarios one after another and return the machine-readable results"""
+    connector = aiohttp.TCPConnector(limit=0)
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+        stop = asyncio.Event()
+        listener = asyncio.create_task(count_log_messages(session, base_url, stop))
+        results: Dict[str, Any] = {}
+        started = time.perf_counter()
+        for scenario in scenarios:
+            if warmup:
+                await run_scenario(scenario, session, base_url, concurrency, warmup, None, max_results)
+            results[scenario] = await run_scenario(scenario, session, base_url, concurrency, requests, duration, max_results)
+            print(f"{scenario}: {json.dumps(results[scenario])}", file=sys.stderr)
+        stop.set()
+        log_counts = await listener
+        elapsed = time.perf_counter() - started
+    return {
+        "config": {
+            "base_url": base_url,
+            "concurrency": concurrency,
+            "requests": requests,
+            "duration": duration,
+            "warmup": warmup,
+            "max_results": max_results,
+        },
+        "scenarios": results,
+        "ws_log_stream": {
+            **log_counts,
+            "messages_per_s": round(log_counts["messages"] / elapsed, 2) if elapsed > 0 else None,
+        },
+    }
+
+def add_load_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--scenario", action="append", choices=SCENARIOS,
+                        help="Scenario to run (repeatable; default: all)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=100, help="Requests per scenario")
+    parser.add_argument("--duration", type=float, default=None, help="Run each scenario for this many seconds instead")
+    parser.add_argument("--warmup", type=int, default=5, help="Unmeasured requests before each scenario")
+    parser.add_argument("--max-results", type=int, default=10, help="max_results for search requests")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request timeout in seconds")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark a running Scholar Assistant backend")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    add_load_arguments(parser)
+    args = parser.parse_args()
+    results = asyncio.run(run_benchmark(
+        args.base_url, args.scenario or list(SCENARIOS), args.concurrency, args.requests,
+        args.duration, args.warmup, args.max_results, args.timeout
+    ))
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+if __name__ == "__main__":
+    main()
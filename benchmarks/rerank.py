@@ -0,0 +1,83 @@
+"""
+Microbenchmark of search result reranking: times rerank_results over
+synthetic enriched result sets of several sizes and fails when the median
+for the largest exceeds --max-ms.
+
+    python benchmarks/rerank.py --sizes 50 200 1000 --output rerank.json
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Any, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from backend.rerank import rerank_results
+
+WORDS = ("graph neural network citation attention transformer embedding knowledge retrieval scholarly "
+         "analysis benchmark survey model data deep learning language semantic search ranking").split()
+
+QUERY = "graph neural network citation analysis"
+
+def synthetic_papers(count: int, abstract_words: int, seed: int) -> List[Dict[str, Any]]:
+    """Result-shaped papers with random titles, abstracts, years and citation counts"""
+    rng = random.Random(seed)
+    return [{
+        "title": " ".join(rng.choices(WORDS, k=rng.randint(4, 12))).capitalize(),
+        "abstract": " ".join(rng.choices(WORDS, k=abstract_words)) if rng.random() > 0.1 else None,
+        "year": rng.randint(1990, 2026) if rng.random() > 0.05 else None,
+        "cited_by_count": int(rng.paretovariate(1.2)) - 1,
+        "id": f"paper-{i}",
+    } for i in range(count)]
+
+def measure(size: int, abstract_words: int, runs: int, seed: int) -> Dict[str, Any]:
+    papers = synthetic_papers(size, abstract_words, seed)
+    rerank_results(QUERY, papers)
+    seconds = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        rerank_results(QUERY, papers)
+        seconds.append(time.perf_counter() - started)
+    seconds.sort()
+    return {
+        "papers": size,
+        "runs": runs,
+        "median_ms": round(statistics.median(seconds) * 1000, 3),
+        "p95_ms": round(seconds[int(len(seconds) * 0.95) - 1] * 1000, 3),
+        "min_ms": round(seconds[0] * 1000, 3),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Time search result reranking")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 50, 200, 1000], help="Result set sizes")
+    parser.add_argument("--abstract-words", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--max-ms", type=float, default=None, help="Fail when the largest size's median exceeds this")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    results = {"query": QUERY, "sizes": [measure(size, args.abstract_words, args.runs, args.seed) for size in args.sizes]}
+    largest = results["sizes"][-1]
+    failures = []
+    if args.max_ms is not None and largest["median_ms"] > args.max_ms:
+        failures.append(f"median {largest['median_ms']} ms for {largest['papers']} papers exceeds --max-ms {args.max_ms}")
+    results["failures"] = failures
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    for failure in failures:
+        print(f"FAIL: {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
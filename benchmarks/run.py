@@ -0,0 +1,144 @@
+"""
+Offline benchmark: starts the stub upstreams and the backend, runs the load
+driver against it and writes one JSON result file to compare between commits.
+
+    python benchmarks/run.py --output bench.json --concurrency 8 --requests 200 --rate-429 0.05
+    python benchmarks/compare.py baseline.json bench.json
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from typing import Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(HERE)
+sys.path.insert(0, HERE)
+
+from load import SCENARIOS, add_load_arguments, run_benchmark
+from stub_upstreams import UPSTREAMS, add_stub_arguments, stub_config_from_args
+
+def wait_until_up(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                return
+        except Exception:
+            if time.monotonic() >= deadline:
+                raise RuntimeError(f"Timed out waiting for {url}")
+            time.sleep(0.2)
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+def backend_env(stub_url: str, args: argparse.Namespace, workdir: str) -> Dict[str, str]:
+    env = dict(os.environ)
+    env.update({
+        "PYTHONPATH": REPO_ROOT + os.pathsep + env.get("PYTHONPATH", ""),
+        "SERPAPI_KEY": "benchmark",
+        "DASHSCOPE_API_KEY": "benchmark",
+        "SERPAPI_BASE_URL": stub_url,
+        "SEMANTIC_SCHOLAR_API": f"{stub_url}/graph/v1",
+        "DASHSCOPE_BASE_URL": f"{stub_url}/compatible-mode/v1",
+        "S2_REQUESTS_PER_SECOND": str(args.s2_rps),
+        "JOBS_DIR": os.path.join(workdir, "jobs"),
+    })
+    return env
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite")
+    parser.add_argument("--output", help="Write the JSON results here instead of stdout")
+    parser.add_argument("--stub-port", type=int, default=9100)
+    parser.add_argument("--api-port", type=int, default=8100)
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for the backend")
+    parser.add_argument("--s2-rps", type=float, default=100.0, help="S2_REQUESTS_PER_SECOND for the backend")
+    add_stub_arguments(parser)
+    add_load_arguments(parser)
+    args = parser.parse_args()
+
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    api_url = f"http://127.0.0.1:{args.api_port}"
+    processes: List[subprocess.Popen] = []
+    # The backend writes search archives and jobs relative to its working directory
+    with tempfile.TemporaryDirectory(prefix="scholar-bench-") as workdir:
+        log_path = os.path.join(workdir, "backend.log")
+        try:
+            processes.append(subprocess.Popen(
+                [sys.executable, os.path.join(HERE, "stub_upstreams.py"), "--port", str(args.stub_port)]
+                + stub_cli_args(args),
+                cwd=workdir
+            ))
+            with open(log_path, "w") as log:
+                processes.append(subprocess.Popen(
+                    [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1",
+                     "--port", str(args.api_port), "--workers", str(args.workers), "--log-level", "warning"],
+                    cwd=workdir, env=backend_env(stub_url, args, workdir), stdout=log, stderr=subprocess.STDOUT
+                ))
+            wait_until_up(f"{stub_url}/stats")
+            wait_until_up(f"{api_url}/metrics")
+
+            results = asyncio.run(run_benchmark(
+                api_url, args.scenario or list(SCENARIOS), args.concurrency, args.requests,
+                args.duration, args.warmup, args.max_results, args.timeout
+            ))
+            with urllib.request.urlopen(f"{stub_url}/stats") as response:
+                upstream_calls = json.load(response)["calls"]
+        finally:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+
+    results.update({
+        "commit": git_commit(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "backend_workers": args.workers,
+        "s2_requests_per_second": args.s2_rps,
+        "stub": stub_config_from_args(args).as_dict(),
+        "upstream_calls": upstream_calls,
+    })
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+def stub_cli_args(args: argparse.Namespace) -> List[str]:
+    """Forward the stub options parsed here to the stub server process"""
+    config = stub_config_from_args(args)
+    cli = [
+        "--latency-ms", str(config.latency_ms),
+        "--jitter-ms", str(config.jitter_ms),
+        "--rate-429", str(config.rate_429),
+        "--results", str(config.results),
+        "--neighbours", str(config.neighbours),
+        "--abstract-chars", str(config.abstract_chars),
+        "--seed", str(config.seed),
+        "--serpapi-rate-429", str(args.serpapi_rate_429),
+        "--dashscope-rate-429", str(args.dashscope_rate_429),
+    ]
+    for upstream in UPSTREAMS:
+        latency = getattr(args, f"{upstream}_latency_ms")
+        if latency is not None:
+            cli += [f"--{upstream.replace('_', '-')}-latency-ms", str(latency)]
+    return cli
+
+if __name__ == "__main__":
+    main()
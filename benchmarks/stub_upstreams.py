@@ -0,0 +1,236 @@
+"""
+Local stand-ins for SerpAPI, Semantic Scholar and the DashScope chat
+endpoint, so the backend can be benchmarked offline and repeatably.
+
+    python benchmarks/stub_upstreams.py --port 9100 --latency-ms 50 --rate-429 0.05
+
+Point the backend at it with:
+
+    SERPAPI_BASE_URL=http://127.0.0.1:9100
+    SEMANTIC_SCHOLAR_API=http://127.0.0.1:9100/graph/v1
+    DASHSCOPE_BASE_URL=http://127.0.0.1:9100/compatible-mode/v1
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+from collections import Counter
+from typing import Any, Dict, Optional
+from aiohttp import web
+
+UPSTREAMS = ("serpapi", "semantic_scholar", "dashscope")
+
+WORDS = (
+    "learning neural network graph citation analysis model deep transformer "
+    "attention retrieval scholarly knowledge embedding survey benchmark data"
+).split()
+
+class StubConfig:
+    """Latency, error rate and payload size of the stand-ins, per upstream"""
+    def __init__(self, latency_ms: float = 50.0, jitter_ms: float = 10.0, rate_429: float = 0.0,
+                 results: int = 10, neighbours: int = 50, abstract_chars: int = 600, seed: int = 0,
+                 overrides: Optional[Dict[str, Dict[str, float]]] = None):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.rate_429 = rate_429
+        self.results = results
+        self.neighbours = neighbours
+        self.abstract_chars = abstract_chars
+        self.seed = seed
+        # upstream -> {"latency_ms": ..., "rate_429": ...}
+        self.overrides = overrides or {}
+
+    def get(self, upstream: str, name: str) -> float:
+        value = self.overrides.get(upstream, {}).get(name)
+        return getattr(self, name) if value is None else value
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "latency_ms": self.latency_ms,
+            "jitter_ms": self.jitter_ms,
+            "rate_429": self.rate_429,
+            "results": self.results,
+            "neighbours": self.neighbours,
+            "abstract_chars": self.abstract_chars,
+            "seed": self.seed,
+            "overrides": self.overrides,
+        }
+
+def paper_id(seed: str) -> str:
+    """Stable 40-hex id, shaped like a Semantic Scholar paperId"""
+    return hashlib.sha1(seed.encode("utf-8")).hexdigest()
+
+def make_title(seed: str) -> str:
+    rng = random.Random(seed)
+    return " ".join(rng.choice(WORDS) for _ in range(7)).capitalize()
+
+def make_paper(config: StubConfig, seed: str, title: Optional[str] = None) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    abstract = " ".join(rng.choice(WORDS) for _ in range(config.abstract_chars // 6 + 1))[:config.abstract_chars]
+    return {
+        "paperId": paper_id(seed),
+        "title": title or make_title(seed),
+        "abstract": abstract,
+        "year": rng.randint(1990, 2025),
+        "citationCount": rng.randint(0, 5000),
+        "authors": [{"authorId": str(rng.randint(1, 10 ** 8)), "name": f"Author {rng.randint(1, 999)}"} for _ in range(3)],
+        "venue": "Stub Conference",
+    }
+
+def make_app(config: StubConfig) -> web.Application:
+    rng = random.Random(config.seed)
+    calls: Counter = Counter()
+
+    async def upstream_delay(upstream: str) -> Optional[web.Response]:
+        """Sleep for the configured latency; returns a 429 response when one is injected"""
+        latency = config.get(upstream, "latency_ms") + rng.uniform(-1, 1) * config.jitter_ms
+        await asyncio.sleep(max(latency, 0) / 1000)
+        calls[upstream] += 1
+        if rng.random() < config.get(upstream, "rate_429"):
+            calls[f"{upstream}_429"] += 1
+            return web.json_response({"error": "Too Many Requests"}, status=429)
+        return None
+
+    async def serpapi_search(request: web.Request) -> web.Response:
+        limited = await upstream_delay("serpapi")
+        if limited:
+            return limited
+        query = request.query.get("q", "")
+        count = min(int(request.query.get("num", config.results)), config.results)
+        results = []
+        for i in range(count):
+            seed = f"{query}:{i}"
+            results.append({
+                "position": i,
+                "title": make_title(seed),
+                "result_id": f"serp-{paper_id(seed)[:12]}",
+                "link": f"https://example.org/papers/{paper_id(seed)}",
+                "snippet": make_paper(config, seed)["abstract"][:200],
+                "publication_info": {"summary": "A Author, B Author - Stub Conference, 2020"},
+            })
+        return web.json_response({
+            "search_metadata": {"status": "Success", "created_at": time.strftime("%Y-%m-%d %H:%M:%S")},
+            "search_parameters": dict(request.query),
+            "organic_results": results,
+        })
+
+    async def s2_search(request: web.Request) -> web.Response:
+        limited = await upstream_delay("semantic_scholar")
+        if limited:
+            return limited
+        title = request.query.get("query", "")
+        # The exact title first (per-paper lookups ask for one result), then related papers
+        count = min(int(request.query.get("limit", 1)), config.results)
+        papers = [make_paper(config, title, title)] + [make_paper(config, f"{title}:{i}") for i in range(1, count)]
+        return web.json_response({"total": len(papers), "offset": 0, "data": papers})
+
+    async def s2_match(request: web.Request) -> web.Response:
+        limited = await upstream_delay("semantic_scholar")
+        if limited:
+            return limited
+        title = request.query.get("query", "")
+        return web.json_response({"data": [{**make_paper(config, title, title), "matchScore": 100.0}]})
+
+    async def s2_paper(request: web.Request) -> web.Response:
+        limited = await upstream_delay("semantic_scholar")
+        if limited:
+            return limited
+        return web.json_response(make_paper(config, request.match_info["paper_id"]))
+
+    def neighbours(request: web.Request, key: str) -> Dict[str, Any]:
+        root = request.match_info["paper_id"]
+        limit = min(int(request.query.get("limit", config.neighbours)), config.neighbours)
+        return {"data": [{key: make_paper(config, f"{root}:{key}:{i}")} for i in range(limit)]}
+
+    async def s2_citations(request: web.Request) -> web.Response:
+        limited = await upstream_delay("semantic_scholar")
+        if limited:
+            return limited
+        return web.json_response(neighbours(request, "citingPaper"))
+
+    async def s2_references(request: web.Request) -> web.Response:
+        limited = await upstream_delay("semantic_scholar")
+        if limited:
+            return limited
+        return web.json_response(neighbours(request, "citedPaper"))
+
+    async def dashscope_chat(request: web.Request) -> web.Response:
+        limited = await upstream_delay("dashscope")
+        if limited:
+            return limited
+        body = await request.json()
+        prompt = body["messages"][-1]["content"]
+        keywords = ", ".join(random.Random(prompt).sample(WORDS, 3))
+        return web.json_response({
+            "id": f"chatcmpl-{paper_id(prompt)[:12]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": keywords},
+                "finish_reason": "stop",
+            }],
+            "usage": {"prompt_tokens": len(prompt), "completion_tokens": len(keywords), "total_tokens": len(prompt) + len(keywords)},
+        })
+
+    async def stats(request: web.Request) -> web.Response:
+        return web.json_response({"config": config.as_dict(), "calls": dict(calls)})
+
+    app = web.Application()
+    # Fixed paths before the {paper_id} patterns, which would otherwise match them
+    app.router.add_get("/search", serpapi_search)
+    app.router.add_get("/search.json", serpapi_search)
+    app.router.add_get("/graph/v1/paper/search", s2_search)
+    app.router.add_get("/graph/v1/paper/search/match", s2_match)
+    app.router.add_get("/graph/v1/paper/{paper_id}/citations", s2_citations)
+    app.router.add_get("/graph/v1/paper/{paper_id}/references", s2_references)
+    app.router.add_get("/graph/v1/paper/{paper_id}", s2_paper)
+    app.router.add_post("/compatible-mode/v1/chat/completions", dashscope_chat)
+    app.router.add_get("/stats", stats)
+    return app
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mean upstream latency")
+    parser.add_argument("--jitter-ms", type=float, default=10.0, help="Uniform latency jitter (+/-)")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of Semantic Scholar calls answered with 429")
+    parser.add_argument("--results", type=int, default=10, help="Organic results per SerpAPI search")
+    parser.add_argument("--neighbours", type=int, default=50, help="Maximum citations/references per paper")
+    parser.add_argument("--abstract-chars", type=int, default=600, help="Abstract length, to scale payload size")
+    parser.add_argument("--seed", type=int, default=0)
+    for upstream in UPSTREAMS:
+        flag = upstream.replace("_", "-")
+        parser.add_argument(f"--{flag}-latency-ms", type=float, default=None, help=f"Latency override for {upstream}")
+    parser.add_argument("--serpapi-rate-429", type=float, default=0.0, help="Fraction of SerpAPI calls answered with 429")
+    parser.add_argument("--dashscope-rate-429", type=float, default=0.0, help="Fraction of DashScope calls answered with 429")
+
+def stub_config_from_args(args: argparse.Namespace) -> StubConfig:
+    overrides: Dict[str, Dict[str, float]] = {upstream: {} for upstream in UPSTREAMS}
+    for upstream in UPSTREAMS:
+        latency = getattr(args, f"{upstream}_latency_ms")
+        if latency is not None:
+            overrides[upstream]["latency_ms"] = latency
+    overrides["serpapi"]["rate_429"] = args.serpapi_rate_429
+    overrides["dashscope"]["rate_429"] = args.dashscope_rate_429
+    return StubConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_429=args.rate_429,
+        results=args.results,
+        neighbours=args.neighbours,
+        abstract_chars=args.abstract_chars,
+        seed=args.seed,
+        overrides={upstream: values for upstream, values in overrides.items() if values},
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description="Stub SerpAPI, Semantic Scholar and DashScope servers")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    web.run_app(make_app(stub_config_from_args(args)), host=args.host, port=args.port, print=None, access_log=None)
+
+if __name__ == "__main__":
+    main()
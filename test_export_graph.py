@@ -0,0 +1,35 @@
+import asyncio
+import json
+import pytest
+from backend import main
+from backend.api import graph
+
+CITATIONS = {"data": [{"citingPaper": {"paperId": "c1", "title": "Citing paper", "citationCount": 3, "year": 2020}}]}
+REFERENCES = {"data": [{"citedPaper": {"paperId": "r1", "title": "Cited paper", "citationCount": 7, "year": 2010}}]}
+
+@pytest.fixture(autouse=True)
+def stub_semantic_scholar(monkeypatch):
+    monkeypatch.setattr(graph, "fetch_citations", lambda paper_id, **kwargs: CITATIONS)
+    monkeypatch.setattr(graph, "fetch_references", lambda paper_id, **kwargs: REFERENCES)
+
+async def export(format: str):
+    response = await main.export_graph("root", format=format)
+    if isinstance(response, dict):
+        return response
+    chunks = []
+    async for chunk in response.body_iterator:
+        chunks.append(chunk if isinstance(chunk, str) else chunk.decode("utf-8"))
+    return "".join(chunks)
+
+def test_export_graph_json():
+    data = asyncio.run(export("json"))
+    # graph.html reads .data.citations.nodes and .data.references.nodes
+    assert [node["id"] for node in data["citations"]["nodes"]] == ["c1"]
+    assert [node["id"] for node in data["references"]["nodes"]] == ["r1"]
+    json.dumps(data)
+
+@pytest.mark.parametrize("format", ["graphml", "gexf", "csv", "jsonl"])
+def test_export_graph_streaming_formats(format):
+    body = asyncio.run(export(format))
+    for paper_id in ("c1", "r1"):
+        assert paper_id in body
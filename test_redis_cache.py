@@ -0,0 +1,26 @@
+import socket
+import time
+import pytest
+from backend.config import settings
+from backend.cache.redis_cache import RedisCache
+
+@pytest.fixture
+def closed_port(monkeypatch):
+    """Point the cache at a local port nothing listens on"""
+    sock = socket.socket()
+    sock.bind(("127.0.0.1", 0))
+    port = sock.getsockname()[1]
+    sock.close()
+    monkeypatch.setattr(settings, "redis_host", "127.0.0.1")
+    monkeypatch.setattr(settings, "redis_port", port)
+    return port
+
+def test_get_is_a_quick_miss_when_redis_is_down(closed_port):
+    started = time.perf_counter()
+    assert RedisCache().get("key") is None
+    assert time.perf_counter() - started < 1.0
+
+def test_set_returns_quickly_when_redis_is_down(closed_port):
+    started = time.perf_counter()
+    RedisCache().set("key", {"value": 1})
+    assert time.perf_counter() - started < 1.0
@@ -14,8 +14,10 @@ async def test_websocket():
                     try:
                         message = await websocket.recv()
                         data = json.loads(message)
-                        if data.get("type") == "log":
-                            print(f"[{data.get('timestamp')}] {data.get('message')}")
+                        # Log messages arrive batched as a JSON array
+                        for item in (data if isinstance(data, list) else [data]):
+                            if item.get("type") == "log":
+                                print(f"[{item.get('timestamp')}] {item.get('message')}")
                     except Exception as e:
                         print(f"Error receiving message: {e}")
                         break
@@ -24,7 +24,7 @@ async def simulate_frontend():
                 print(f"[{timestamp}] Received: {data}")
                 
                 # If it's a ping message, respond with pong
-                if data.get("type") == "ping":
+                if isinstance(data, dict) and data.get("type") == "ping":
                     print(f"[{timestamp}] Sending pong response")
                     await websocket.send(json.dumps({"type": "pong", "timestamp": int(time.time())}))
                     
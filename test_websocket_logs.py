@@ -18,12 +18,14 @@ async def test_websocket_logs():
                     timestamp = time.strftime('%H:%M:%S', time.localtime())
                     print(f"[{timestamp}] Received: {data}")
                     
-                    if data.get("type") == "log":
-                        print(f"[{timestamp}] LOG: {data.get('message')}")
-                    elif data.get("type") == "ping":
-                        print(f"[{timestamp}] PING received")
-                        # Send pong response
-                        await websocket.send(json.dumps({"type": "pong", "timestamp": int(time.time())}))
+                    # Log messages arrive batched as a JSON array
+                    for item in (data if isinstance(data, list) else [data]):
+                        if item.get("type") == "log":
+                            print(f"[{timestamp}] LOG: {item.get('message')}")
+                        elif item.get("type") == "ping":
+                            print(f"[{timestamp}] PING received")
+                            # Send pong response
+                            await websocket.send(json.dumps({"type": "pong", "timestamp": int(time.time())}))
                         
                 except asyncio.TimeoutError:
                     # Send a ping to keep connection alive
@@ -16,8 +16,10 @@ async def test_websocket():
                     message = await asyncio.wait_for(websocket.recv(), timeout=1.0)
                     data = json.loads(message)
                     timestamp = time.strftime('%H:%M:%S', time.localtime())
-                    if data.get("type") == "log":
-                        print(f"[{timestamp}] LOG: {data.get('message')}")
+                    # Log messages arrive batched as a JSON array
+                    for item in (data if isinstance(data, list) else [data]):
+                        if item.get("type") == "log":
+                            print(f"[{timestamp}] LOG: {item.get('message')}")
                 except asyncio.TimeoutError:
                     continue
                 except websockets.exceptions.ConnectionClosed: